@@ -0,0 +1,54 @@
+"""Add composite indexes for task query patterns
+
+Revision ID: 003_add_task_query_indexes
+Revises: 002_add_user_management
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003_add_task_query_indexes'
+down_revision = '002_add_user_management'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # タスク一覧（user_id で絞り込み、created_at, id の降順）
+    op.create_index(
+        'ix_tasks_user_id_created_at',
+        'tasks',
+        ['user_id', sa.text('created_at DESC'), sa.text('id DESC')],
+        unique=False
+    )
+    # 完了状態・優先度での絞り込み
+    op.create_index(
+        'ix_tasks_user_id_is_completed_priority',
+        'tasks',
+        ['user_id', 'is_completed', 'priority'],
+        unique=False
+    )
+    # カテゴリでの絞り込み・カテゴリ削除時の一括更新
+    op.create_index(
+        'ix_tasks_user_id_category_id',
+        'tasks',
+        ['user_id', 'category_id'],
+        unique=False
+    )
+    # ユーザーのカテゴリ一覧（名前順）
+    op.create_index(
+        'ix_categories_user_id_name',
+        'categories',
+        ['user_id', 'name'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_categories_user_id_name', table_name='categories')
+    op.drop_index('ix_tasks_user_id_category_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_is_completed_priority', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_created_at', table_name='tasks')
@@ -0,0 +1,50 @@
+"""Add trigram indexes for task search
+
+Revision ID: 004_add_task_search_indexes
+Revises: 003_add_task_query_indexes
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004_add_task_search_indexes'
+down_revision = '003_add_task_query_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # pg_trgm は PostgreSQL 専用（SQLite等では ILIKE のままで動作する）
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # ILIKE '%x%' と similarity() の両方に使えるトライグラムGINインデックス。
+    # インデックスは INSERT/UPDATE 時に自動で更新される。
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_tasks_title_trgm',
+        'tasks',
+        ['title'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'title': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_tasks_description_trgm',
+        'tasks',
+        ['description'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'description': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.drop_index('ix_tasks_description_trgm', table_name='tasks')
+    op.drop_index('ix_tasks_title_trgm', table_name='tasks')
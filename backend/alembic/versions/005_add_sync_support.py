@@ -0,0 +1,52 @@
+"""Add delta sync support (category updated_at and deletion tombstones)
+
+Revision ID: 005_add_sync_support
+Revises: 004_add_task_search_indexes
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005_add_sync_support'
+down_revision = '004_add_task_search_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # カテゴリの更新日時（差分同期用）
+    op.add_column(
+        'categories',
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True)
+    )
+    op.create_index('ix_tasks_user_id_updated_at', 'tasks', ['user_id', 'updated_at'], unique=False)
+
+    # 削除記録（トゥームストーン）
+    op.create_table(
+        'sync_tombstones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('entity_type', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_sync_tombstones_id'), 'sync_tombstones', ['id'], unique=False)
+    op.create_index(
+        'ix_sync_tombstones_user_id_deleted_at',
+        'sync_tombstones',
+        ['user_id', 'deleted_at'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sync_tombstones_user_id_deleted_at', table_name='sync_tombstones')
+    op.drop_index(op.f('ix_sync_tombstones_id'), table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
+    op.drop_index('ix_tasks_user_id_updated_at', table_name='tasks')
+    op.drop_column('categories', 'updated_at')
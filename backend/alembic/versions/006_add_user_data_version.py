@@ -0,0 +1,27 @@
+"""Add per-user data version for conditional GET
+
+Revision ID: 006_add_user_data_version
+Revises: 005_add_sync_support
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006_add_user_data_version'
+down_revision = '005_add_sync_support'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'users',
+        sa.Column('data_version', sa.Integer(), server_default='0', nullable=False)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'data_version')
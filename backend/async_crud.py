@@ -0,0 +1,177 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import select, insert, update, delete
+from typing import Optional
+import models, schemas
+from crud import (
+    filter_tasks, paginate_tasks, data_version_bump, with_returning,
+    task_returning, attach_returned_category, tombstone_prune
+)
+
+# 非同期版CRUD（USE_ASYNC_DB=true の場合に async_routes から使用）
+# 絞り込み・ページングのロジックは crud と共通
+
+# User CRUD operations
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    """IDでユーザーを取得"""
+    result = await db.execute(select(models.User).filter(models.User.id == user_id))
+    return result.scalars().first()
+
+async def get_data_version(db: AsyncSession, user_id: int) -> int:
+    """ユーザーの data_version を取得"""
+    result = await db.execute(select(models.User.data_version).where(models.User.id == user_id))
+    return result.scalar() or 0
+
+# Task CRUD operations
+def _task_select():
+    """カテゴリを同一クエリでJOINして読み込むタスクSELECT"""
+    return select(models.Task).options(joinedload(models.Task.category))
+
+async def get_tasks(db: AsyncSession, user_id: int, **filters):
+    """ユーザーのタスクを条件付きで取得"""
+    stmt = filter_tasks(_task_select(), db.get_bind().dialect.name, user_id=user_id, **filters)
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
+async def get_task_page(db: AsyncSession, user_id: int, limit: int, cursor: Optional[str] = None, **filters):
+    """キーセットページングでタスクを1ページ分取得し、(tasks, next_cursor) を返す"""
+    tasks = await get_tasks(db, user_id=user_id, limit=limit + 1, cursor=cursor, **filters)
+    return paginate_tasks(list(tasks), limit)
+
+async def get_task(db: AsyncSession, task_id: int, user_id: int):
+    """ユーザーの特定のタスクを取得"""
+    result = await db.execute(_task_select().filter(
+        models.Task.id == task_id,
+        models.Task.user_id == user_id
+    ))
+    return result.scalars().first()
+
+async def create_task(db: AsyncSession, task: schemas.TaskCreate, user_id: int):
+    """新規タスクを作成"""
+    result = await db.execute(task_returning(
+        insert(models.Task).values(
+            title=task.title,
+            description=task.description,
+            priority=task.priority,
+            due_date=task.due_date,
+            category_id=task.category_id,
+            user_id=user_id
+        )
+    ))
+    db_task = attach_returned_category(db, result.one())
+    await db.execute(data_version_bump(user_id))
+    await db.commit()
+    return db_task
+
+async def update_task(db: AsyncSession, task_id: int, task: schemas.TaskUpdate, user_id: int):
+    """タスクを更新"""
+    update_data = task.model_dump(exclude_unset=True)
+    if not update_data:
+        return await get_task(db, task_id=task_id, user_id=user_id)
+    
+    result = await db.execute(task_returning(
+        update(models.Task)
+        .where(models.Task.id == task_id, models.Task.user_id == user_id)
+        .values(**update_data)
+    ))
+    row = result.one_or_none()
+    if row is None:
+        await db.rollback()
+        return None
+    
+    db_task = attach_returned_category(db, row)
+    await db.execute(data_version_bump(user_id))
+    await db.commit()
+    return db_task
+
+async def delete_task(db: AsyncSession, task_id: int, user_id: int):
+    """タスクを削除"""
+    result = await db.execute(
+        delete(models.Task)
+        .where(models.Task.id == task_id, models.Task.user_id == user_id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        await db.rollback()
+        return False
+    
+    db.add(models.SyncTombstone(user_id=user_id, entity_type="task", entity_id=task_id))
+    await db.execute(tombstone_prune(user_id))
+    await db.execute(data_version_bump(user_id))
+    await db.commit()
+    return True
+
+# Category CRUD operations
+async def get_categories(db: AsyncSession, user_id: int):
+    """ユーザーのカテゴリを取得"""
+    result = await db.execute(select(models.Category).filter(
+        models.Category.user_id == user_id
+    ).order_by(models.Category.name))
+    return result.scalars().all()
+
+async def get_category(db: AsyncSession, category_id: int, user_id: int):
+    """ユーザーの特定のカテゴリを取得"""
+    result = await db.execute(select(models.Category).filter(
+        models.Category.id == category_id,
+        models.Category.user_id == user_id
+    ))
+    return result.scalars().first()
+
+async def create_category(db: AsyncSession, category: schemas.CategoryCreate, user_id: int):
+    """新規カテゴリを作成"""
+    result = await db.execute(with_returning(
+        insert(models.Category).values(
+            name=category.name,
+            color=category.color,
+            user_id=user_id
+        ),
+        models.Category
+    ))
+    db_category = result.scalar_one()
+    await db.execute(data_version_bump(user_id))
+    await db.commit()
+    return db_category
+
+async def update_category(db: AsyncSession, category_id: int, category: schemas.CategoryUpdate, user_id: int):
+    """カテゴリを更新"""
+    update_data = category.model_dump(exclude_unset=True)
+    if not update_data:
+        return await get_category(db, category_id=category_id, user_id=user_id)
+    
+    result = await db.execute(with_returning(
+        update(models.Category)
+        .where(models.Category.id == category_id, models.Category.user_id == user_id)
+        .values(**update_data),
+        models.Category
+    ))
+    db_category = result.scalar_one_or_none()
+    if db_category is None:
+        await db.rollback()
+        return None
+    
+    await db.execute(data_version_bump(user_id))
+    await db.commit()
+    return db_category
+
+async def delete_category(db: AsyncSession, category_id: int, user_id: int):
+    """カテゴリを削除"""
+    # カテゴリに属するタスクのcategory_idをNullに設定
+    await db.execute(update(models.Task).where(
+        models.Task.category_id == category_id,
+        models.Task.user_id == user_id
+    ).values(category_id=None).execution_options(synchronize_session=False))
+    
+    result = await db.execute(
+        delete(models.Category)
+        .where(models.Category.id == category_id, models.Category.user_id == user_id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        await db.rollback()
+        return False
+    
+    db.add(models.SyncTombstone(user_id=user_id, entity_type="category", entity_id=category_id))
+    await db.execute(tombstone_prune(user_id))
+    await db.execute(data_version_bump(user_id))
+    await db.commit()
+    return True
@@ -0,0 +1,42 @@
+import os
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from config.settings import settings
+from fastapi.concurrency import run_in_threadpool
+from database import pool_options, ensure_schema, SCHEMA_READY_ENV
+import metrics
+from diagnostics import instrument_slow_queries
+
+# 非同期ドライバ対応表（同期用URLのドライバ部分を置き換える）
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    """同期用のDATABASE_URLを非同期ドライバ用のURLに変換"""
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    return f"{ASYNC_DRIVERS.get(dialect, scheme)}://{rest}"
+
+# データベースURL
+ASYNC_DATABASE_URL = to_async_url(settings.database_url)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options())
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+if settings.metrics_enabled:
+    metrics.instrument_engine(async_engine.sync_engine)
+if settings.diagnostics_enabled:
+    instrument_slow_queries(async_engine.sync_engine, settings.slow_query_threshold_ms)
+
+# fork後の子プロセスでは親のコネクションを使わないようプールを作り直す
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: async_engine.sync_engine.dispose(close=False))
+
+# データベース依存関数
+async def get_async_db():
+    if settings.db_create_schema and not os.environ.get(SCHEMA_READY_ENV):
+        await run_in_threadpool(ensure_schema)
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,195 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Union
+import models, schemas, async_crud, etags, responses
+from async_database import get_async_db
+from auth import security, get_user_id_from_token, ensure_active_user
+from cache import user_cache
+from security import api_rate_limit
+
+# 非同期版エンドポイント（USE_ASYNC_DB=true の場合に main で同期版より先に登録）
+# 同期版と同じパス・レスポンスで、スレッドプールを使わずにDBを待機する。
+# OpenAPIには同期版が掲載されるため、ここではスキーマに含めない。
+router = APIRouter(include_in_schema=False, dependencies=[Depends(api_rate_limit)])
+auth_router = APIRouter(include_in_schema=False, dependencies=[Depends(api_rate_limit)])
+
+async def get_current_user_async(credentials: HTTPAuthorizationCredentials = Depends(security),
+                                 db: AsyncSession = Depends(get_async_db)):
+    """現在のユーザーを取得（非同期版）"""
+    user_id = get_user_id_from_token(credentials.credentials)
+    user = user_cache.get(user_id)
+    if user is None:
+        user = await async_crud.get_user_by_id(db, user_id=user_id)
+        if user is not None:
+            user_cache.set(user)
+    return ensure_active_user(user)
+
+# Task endpoints
+@router.get("/api/tasks", response_model=Union[schemas.TaskPage, List[schemas.Task]])
+async def get_tasks(
+    request: Request,
+    search: Optional[str] = Query(None, description="検索キーワード"),
+    category_id: Optional[int] = Query(None, description="カテゴリID"),
+    priority: Optional[int] = Query(None, ge=1, le=3, description="優先度 (1=High, 2=Medium, 3=Low)"),
+    is_completed: Optional[bool] = Query(None, description="完了状態"),
+    limit: Optional[int] = Query(None, ge=1, le=200, description="1ページの件数（指定時はページング形式で返す）"),
+    cursor: Optional[str] = Query(None, description="前ページの next_cursor"),
+    ranked: bool = Query(False, description="検索結果を関連度順に並べる（search指定時のみ）"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    """ユーザーのタスクを条件付きで取得"""
+    etag = etags.version_etag(request, current_user.id, await async_crud.get_data_version(db, current_user.id))
+    if etags.is_not_modified(request, etag):
+        return etags.not_modified_response(etag)
+    
+    filters = dict(search=search, category_id=category_id, priority=priority, is_completed=is_completed)
+    if limit is None and cursor is None:
+        tasks = await async_crud.get_tasks(db, user_id=current_user.id, ranked=ranked, **filters)
+        result = responses.pydantic_json_response(schemas.TaskListAdapter, tasks)
+        etags.set_etag_headers(result, etag)
+        return result
+    
+    if ranked:
+        raise HTTPException(status_code=400, detail="ranked cannot be combined with pagination")
+    
+    try:
+        tasks, next_cursor = await async_crud.get_task_page(
+            db, user_id=current_user.id, limit=limit or 50, cursor=cursor, **filters
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    result = responses.pydantic_json_response(
+        schemas.TaskPageAdapter, {"items": tasks, "next_cursor": next_cursor}
+    )
+    etags.set_etag_headers(result, etag)
+    return result
+
+@router.post("/api/tasks", response_model=schemas.Task)
+async def create_task(
+    task: schemas.TaskCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    """新規タスクを作成"""
+    return await async_crud.create_task(db=db, task=task, user_id=current_user.id)
+
+# {task_id:int} で数値のみに一致させ、同期版の固定パス（/api/tasks/xxx）を隠さない
+@router.get("/api/tasks/{task_id:int}", response_model=schemas.Task)
+async def get_task(
+    task_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    """特定のタスクを取得"""
+    etag = etags.version_etag(request, current_user.id, await async_crud.get_data_version(db, current_user.id))
+    if etags.is_not_modified(request, etag):
+        return etags.not_modified_response(etag)
+    etags.set_etag_headers(response, etag)
+    
+    db_task = await async_crud.get_task(db, task_id=task_id, user_id=current_user.id)
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return db_task
+
+@router.put("/api/tasks/{task_id:int}", response_model=schemas.Task)
+async def update_task(
+    task_id: int,
+    task: schemas.TaskUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    """タスクを更新"""
+    db_task = await async_crud.update_task(db, task_id=task_id, task=task, user_id=current_user.id)
+    if db_task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return db_task
+
+@router.delete("/api/tasks/{task_id:int}")
+async def delete_task(
+    task_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    """タスクを削除"""
+    success = await async_crud.delete_task(db, task_id=task_id, user_id=current_user.id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return {"message": "Task deleted successfully"}
+
+# Category endpoints
+@router.get("/api/categories", response_model=List[schemas.Category])
+async def get_categories(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    """ユーザーのカテゴリを取得"""
+    etag = etags.version_etag(request, current_user.id, await async_crud.get_data_version(db, current_user.id))
+    if etags.is_not_modified(request, etag):
+        return etags.not_modified_response(etag)
+    etags.set_etag_headers(response, etag)
+    
+    return await async_crud.get_categories(db, user_id=current_user.id)
+
+@router.post("/api/categories", response_model=schemas.Category)
+async def create_category(
+    category: schemas.CategoryCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    """新規カテゴリを作成"""
+    return await async_crud.create_category(db=db, category=category, user_id=current_user.id)
+
+@router.get("/api/categories/{category_id:int}", response_model=schemas.Category)
+async def get_category(
+    category_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    """特定のカテゴリを取得"""
+    db_category = await async_crud.get_category(db, category_id=category_id, user_id=current_user.id)
+    if db_category is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return db_category
+
+@router.put("/api/categories/{category_id:int}", response_model=schemas.Category)
+async def update_category(
+    category_id: int,
+    category: schemas.CategoryUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    """カテゴリを更新"""
+    db_category = await async_crud.update_category(db, category_id=category_id, category=category, user_id=current_user.id)
+    if db_category is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return db_category
+
+@router.delete("/api/categories/{category_id:int}")
+async def delete_category(
+    category_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: models.User = Depends(get_current_user_async)
+):
+    """カテゴリを削除"""
+    success = await async_crud.delete_category(db, category_id=category_id, user_id=current_user.id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return {"message": "Category deleted successfully"}
+
+# User endpoints（パスワードハッシュを伴う登録・ログイン・更新は同期版のまま）
+@auth_router.get("/me", response_model=schemas.UserProfile)
+async def get_current_user_profile(request: Request, current_user: models.User = Depends(get_current_user_async)):
+    """現在のユーザープロフィールを取得"""
+    profile = schemas.UserProfile.model_validate(current_user)
+    return etags.json_response_with_etag(request, profile.model_dump_json().encode())
+
+@auth_router.post("/verify-token", response_model=schemas.UserProfile)
+async def verify_user_token(current_user: models.User = Depends(get_current_user_async)):
+    """トークンを検証してユーザー情報を返す"""
+    return schemas.UserProfile.model_validate(current_user)
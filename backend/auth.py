@@ -1,13 +1,16 @@
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 import secrets
+import hashlib
+import time
 import os
 from config.settings import settings
 import crud
+from cache import user_cache, LocalTTLCache
+import metrics
 from database import get_db
 
 # JWT設定
@@ -18,6 +21,10 @@ ACCESS_TOKEN_EXPIRE_HOURS = settings.access_token_expire_hours
 # HTTPBearer認証スキーム
 security = HTTPBearer()
 
+# 検証済みトークンのキャッシュ（トークンのSHA-256 -> ペイロード）
+# 署名検証済みのペイロードのみを保持し、exp を過ぎたエントリは返さない
+token_cache = LocalTTLCache(maxsize=settings.token_cache_size, ttl=settings.token_cache_ttl)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """JWTアクセストークンを作成"""
     to_encode = data.copy()
@@ -32,11 +39,31 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         "type": "access"
     })
     
+    from jose import jwt  # python-jose（cryptography）の import は起動時間短縮のため初回使用時に行う
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 def verify_token(token: str) -> dict:
-    """JWTトークンを検証してペイロードを返す"""
+    """JWTトークンを検証してペイロードを返す（検証済みトークンはキャッシュから返す）"""
+    if settings.token_cache_size <= 0:
+        with metrics.timed("jwt_verify"):
+            return _decode_token(token)
+    
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(digest)
+    if payload is not None and payload["exp"] > time.time():
+        return payload
+    
+    with metrics.timed("jwt_verify"):
+        payload = _decode_token(token)
+    remaining = payload["exp"] - time.time()
+    if remaining > 0:
+        token_cache.set(digest, payload, ttl=min(settings.token_cache_ttl, remaining))
+    return payload
+
+def _decode_token(token: str) -> dict:
+    """JWTトークンの署名とクレームを検証してペイロードを返す"""
+    from jose import JWTError, jwt
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         
@@ -66,10 +93,8 @@ def verify_token(token: str) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), 
-                     db: Session = Depends(get_db)):
-    """現在のユーザーを取得"""
-    token = credentials.credentials
+def get_user_id_from_token(token: str) -> int:
+    """トークンを検証してユーザーIDを取得"""
     payload = verify_token(token)
     
     user_id = payload.get("user_id")
@@ -79,8 +104,10 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             detail="Invalid token payload",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    user = crud.get_user_by_id(db, user_id=user_id)
+    return user_id
+
+def ensure_active_user(user):
+    """ユーザーが存在し有効であることを確認"""
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -97,6 +124,17 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     
     return user
 
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), 
+                     db: Session = Depends(get_db)):
+    """現在のユーザーを取得（ユーザー行はキャッシュから取得し、なければDBを参照）"""
+    user_id = get_user_id_from_token(credentials.credentials)
+    user = user_cache.get(user_id)
+    if user is None:
+        user = crud.get_user_by_id(db, user_id=user_id)
+        if user is not None:
+            user_cache.set(user)
+    return ensure_active_user(user)
+
 def get_current_session(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """現在のセッション情報を取得（下位互換性のため残す）"""
     token = credentials.credentials
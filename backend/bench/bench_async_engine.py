@@ -0,0 +1,108 @@
+import os
+# SQLite の既定のコネクションプール（5 + overflow 10）に同期版のスレッド数を合わせる
+os.environ.setdefault("THREADPOOL_SIZE", "15")
+import benchenv  # noqa: E402  アプリの import 前に設定を与える
+import argparse
+import asyncio
+import sqlite3
+import time
+import httpx
+from anyio import to_thread
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+import async_database
+import database
+import main
+from async_routes import router as async_router, auth_router as async_auth_router
+
+# 同期エンジン（スレッドプール）と非同期エンジン（USE_ASYNC_DB=true）の負荷比較
+# 同じアプリに対して同時接続数を変えながら GET /api/tasks?limit=20 を送り、スループットとレイテンシを測る。
+# --db-latency-ms で各SQLの実行に待ち時間を加え、遅いDB（ネットワーク越しのPostgreSQL等）を模擬する。
+
+SYNC_ROUTES = list(main.app.router.routes)
+
+def use_async_routes(enabled: bool):
+    """USE_ASYNC_DB=true と同じく非同期版ルートを同期版より先に登録する"""
+    routes = FastAPI()
+    routes.include_router(async_router)
+    routes.include_router(async_auth_router, prefix="/auth")
+    main.app.router.routes = (routes.router.routes if enabled else []) + SYNC_ROUTES
+
+def add_db_latency(latency: float):
+    """SQLの実行ごとに latency 秒待つ
+
+    sqlite3 のカーソルで待つため、同期版はスレッドプールのスレッド、非同期版は aiosqlite の
+    スレッドで待ち、イベントループは止めない（before_cursor_execute は非同期版ではループ上で呼ばれる）。
+    最初の接続より前に呼ぶこと。
+    """
+    class SlowCursor(sqlite3.Cursor):
+        def execute(self, *args):
+            time.sleep(latency)
+            return super().execute(*args)
+
+        def executemany(self, *args):
+            time.sleep(latency)
+            return super().executemany(*args)
+
+    class SlowConnection(sqlite3.Connection):
+        def cursor(self, factory=SlowCursor):
+            return super().cursor(factory)
+
+    def use_slow_connection(dialect, conn_rec, cargs, cparams):
+        cparams["factory"] = SlowConnection
+
+    for engine in (database.engine, async_database.async_engine.sync_engine):
+        event.listen(engine, "do_connect", use_slow_connection)
+
+async def run_load(headers: dict, concurrency: int, requests: int) -> tuple:
+    """concurrency 本の同時接続で requests 件のリクエストを送り、(req/s, p50 ms, p99 ms) を返す"""
+    latencies = []
+    remaining = iter(range(requests))
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                response = await client.get("/api/tasks", params={"limit": 20}, headers=headers)
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return requests / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1]
+
+def main_():
+    parser = argparse.ArgumentParser(description="Compare the sync and async DB engines under load")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--db-latency-ms", type=float, default=0)
+    args = parser.parse_args()
+
+    if args.db_latency_ms:
+        add_db_latency(args.db_latency_ms / 1000)
+    benchenv.reset_database()
+    with TestClient(main.app) as client:
+        headers = benchenv.create_user(client)
+    benchenv.insert_tasks(user_id=1, count=200)
+
+    async def run_all():
+        # 非同期エンジンのプールはイベントループに紐づくため、全計測を1つのループで行う
+        # 起動時の設定（main.prepare_worker）と同じく、スレッド数をDBプールの上限に合わせる
+        to_thread.current_default_thread_limiter().total_tokens = database.threadpool_size()
+        rows = []
+        for concurrency in args.concurrency:
+            for mode in ("sync", "async"):
+                use_async_routes(mode == "async")
+                throughput, p50, p99 = await run_load(headers, concurrency, args.requests)
+                rows.append([mode, concurrency, f"{throughput:.0f}", f"{p50:.1f}", f"{p99:.1f}"])
+        return rows
+
+    rows = asyncio.run(run_all())
+    print(f"DB latency {args.db_latency_ms:g} ms/statement, {args.requests} requests")
+    benchenv.print_table(["engine", "concurrency", "req/s", "p50 ms", "p99 ms"], rows)
+
+if __name__ == "__main__":
+    main_()
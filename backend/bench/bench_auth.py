@@ -0,0 +1,69 @@
+import benchenv  # noqa: F401  アプリの import 前に設定を与える
+import argparse
+from contextlib import contextmanager
+from fastapi.security import HTTPAuthorizationCredentials
+from fastapi.testclient import TestClient
+import auth
+import database
+import main
+from cache import user_cache
+from config.settings import settings
+
+# リクエストごとの認証処理（JWT検証とユーザー行の取得）のキャッシュ有無による比較
+# - verify_token: 署名検証のみ
+# - get_current_user: 署名検証 + ユーザー行（キャッシュなしは users へのSELECT）
+# - GET /auth/me: TestClient 経由の1リクエスト全体（ミドルウェア等を含む）
+
+@contextmanager
+def caches(enabled: bool):
+    """検証済みトークンとユーザー行のキャッシュを有効・無効にする（無効時は TOKEN_CACHE_SIZE=0 と同じ）"""
+    token_cache_size, backend = settings.token_cache_size, user_cache.backend
+    if not enabled:
+        settings.token_cache_size = 0
+        user_cache.backend = None
+    try:
+        yield
+    finally:
+        settings.token_cache_size, user_cache.backend = token_cache_size, backend
+
+def per_call_us(func, calls: int, repeat: int) -> float:
+    """func を calls 回呼ぶ処理を repeat 回計測し、1回あたりの中央値（マイクロ秒）を返す"""
+    def run():
+        for _ in range(calls):
+            func()
+    return benchenv.timed(run, repeat) * 1000 / calls
+
+def main_():
+    parser = argparse.ArgumentParser(description="Measure per-request authentication overhead with and without caches")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    benchenv.reset_database()
+    with TestClient(main.app) as client:
+        headers = benchenv.create_user(client)
+        token = headers["Authorization"].split(" ", 1)[1]
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+        def current_user():
+            with database.SessionLocal() as db:
+                auth.get_current_user(credentials, db)
+
+        measurements = [
+            ("verify_token", lambda: auth.verify_token(token), args.calls),
+            ("get_current_user", current_user, args.calls),
+            ("GET /auth/me", lambda: client.get("/auth/me", headers=headers), args.calls // 10),
+        ]
+        rows = []
+        for name, func, calls in measurements:
+            results = {}
+            for enabled in (False, True):
+                with caches(enabled):
+                    func()  # キャッシュを温める
+                    results[enabled] = per_call_us(func, calls, args.repeat)
+            rows.append([name, f"{results[False]:.1f}", f"{results[True]:.1f}", f"{results[False] / results[True]:.1f}x"])
+
+    benchenv.print_table(["operation", "no cache µs", "cached µs", "speedup"], rows)
+
+if __name__ == "__main__":
+    main_()
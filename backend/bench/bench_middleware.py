@@ -0,0 +1,99 @@
+import benchenv  # noqa: F401  アプリの import 前に設定を与える
+import argparse
+import asyncio
+import time
+import httpx
+from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.responses import Response
+from security import RequestSizeLimitMiddleware, SecurityHeadersMiddleware
+
+# セキュリティヘッダー・リクエストサイズ制限のミドルウェアの比較
+# - BaseHTTPMiddleware: 変更前の app.middleware("http") による実装（下の2関数）
+# - pure ASGI: 現在の SecurityHeadersMiddleware / RequestSizeLimitMiddleware
+# ミドルウェア以外の差が出ないよう、DBを使わない小さなアプリに同じ2つを付けて比べる。
+
+MAX_REQUEST_SIZE = 1024 * 1024
+
+async def add_security_headers(request: Request, call_next):
+    """変更前のセキュリティヘッダーミドルウェア"""
+    response: Response = await call_next(request)
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    response.headers["X-Frame-Options"] = "DENY"
+    response.headers["X-XSS-Protection"] = "1; mode=block"
+    response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+    response.headers["Content-Security-Policy"] = "default-src 'self'"
+    return response
+
+async def limit_upload_size(request: Request, call_next):
+    """変更前のリクエストサイズ制限ミドルウェア"""
+    content_length = request.headers.get("content-length")
+    if content_length and int(content_length) > MAX_REQUEST_SIZE:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Request entity too large")
+    return await call_next(request)
+
+def build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"size": len(await request.body())}
+
+    if variant == "BaseHTTPMiddleware":
+        app.middleware("http")(add_security_headers)
+        app.middleware("http")(limit_upload_size)
+    elif variant == "pure ASGI":
+        app.add_middleware(SecurityHeadersMiddleware)
+        app.add_middleware(RequestSizeLimitMiddleware, max_size=MAX_REQUEST_SIZE)
+    return app
+
+async def run_load(app: FastAPI, method: str, path: str, body: bytes, concurrency: int, requests: int) -> tuple:
+    """concurrency 本の同時接続で requests 件送り、(req/s, p50 ms, p99 ms) を返す"""
+    latencies = []
+    remaining = iter(range(requests))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                response = await client.request(method, path, content=body or None)
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return requests / elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1]
+
+def main_():
+    parser = argparse.ArgumentParser(description="Compare BaseHTTPMiddleware with pure ASGI middleware throughput")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    scenarios = [
+        ("GET /ping", "GET", "/ping", b""),
+        ("POST /echo 64KB", "POST", "/echo", b"x" * 64 * 1024),
+    ]
+
+    async def run_all():
+        rows = []
+        for label, method, path, body in scenarios:
+            for variant in ("none", "BaseHTTPMiddleware", "pure ASGI"):
+                app = build_app(variant)
+                await run_load(app, method, path, body, args.concurrency, 200)  # ウォームアップ
+                throughput, p50, p99 = await run_load(app, method, path, body, args.concurrency, args.requests)
+                rows.append([label, variant, f"{throughput:.0f}", f"{p50:.1f}", f"{p99:.1f}"])
+        return rows
+
+    rows = asyncio.run(run_all())
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    benchenv.print_table(["request", "middleware", "req/s", "p50 ms", "p99 ms"], rows)
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,104 @@
+import benchenv  # noqa: F401  アプリの import 前に設定を与える
+import argparse
+import gzip
+import json
+import random
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+import compression
+import crud
+import database
+import main
+import models
+import responses
+import schemas
+from config.settings import settings
+
+# GET /api/tasks（全件）の本文の生成時間と、転送されるバイト数の比較
+# - jsonable_encoder + json.dumps: response_model で返していた従来の経路（標準のJSONResponse）
+# - jsonable_encoder + orjson: FastJSONResponse（orjson 未インストール時は計測しない）
+# - TypeAdapter.dump_json: 現在の経路（responses.pydantic_json_response）
+
+WORDS = (
+    "buy milk call review report draft meeting client invoice deploy fix bug update docs plan sprint "
+    "email budget order book flight renew license clean garage pay rent prepare slides backup photos"
+).split()
+
+def insert_varied_tasks(count: int):
+    """タイトル・説明・優先度・期限が行ごとに異なるタスクを追加（同じ文字列の繰り返しで圧縮率が高く出ないようにする）"""
+    rng = random.Random(0)
+    with database.engine.begin() as conn:
+        conn.execute(models.Category.__table__.insert(), {"user_id": 1, "name": "Work", "color": "#ff0000"})
+        conn.execute(models.Task.__table__.insert(), [
+            {
+                "user_id": 1,
+                "title": " ".join(rng.choices(WORDS, k=rng.randint(2, 6))).capitalize(),
+                "description": " ".join(rng.choices(WORDS, k=rng.randint(0, 30))) or None,
+                "priority": rng.randint(1, 3),
+                "is_completed": rng.random() < 0.3,
+                "due_date": datetime(2030, 1, 1) + timedelta(minutes=rng.randint(0, 500000)) if rng.random() < 0.5 else None,
+                "category_id": 1 if rng.random() < 0.5 else None,
+            }
+            for _ in range(count)
+        ])
+
+def stdlib_body(tasks) -> bytes:
+    data = schemas.TaskListAdapter.dump_python(schemas.TaskListAdapter.validate_python(tasks, from_attributes=True), mode="json")
+    return json.dumps(jsonable_encoder(data), ensure_ascii=False, separators=(",", ":")).encode()
+
+def orjson_body(tasks) -> bytes:
+    data = schemas.TaskListAdapter.dump_python(schemas.TaskListAdapter.validate_python(tasks, from_attributes=True), mode="json")
+    return responses.FastJSONResponse(jsonable_encoder(data)).body
+
+def pydantic_body(tasks) -> bytes:
+    return responses.pydantic_json_response(schemas.TaskListAdapter, tasks).body
+
+def compress(body: bytes, encoding: str) -> bytes:
+    compressor = compression._Compressor(encoding, settings.compression_gzip_level, settings.compression_brotli_quality)
+    return compressor.compress(body) + compressor.finish()
+
+def main_():
+    parser = argparse.ArgumentParser(description="Measure task list serialization time and response size")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    serializers = [("jsonable_encoder + json.dumps", stdlib_body), ("TypeAdapter.dump_json", pydantic_body)]
+    if responses.orjson is not None:
+        serializers.insert(1, ("jsonable_encoder + orjson", orjson_body))
+    encodings = ["gzip"] + (["br"] if compression.brotli is not None else [])
+
+    timing_rows = []
+    size_rows = []
+    for count in args.counts:
+        benchenv.reset_database()
+        with TestClient(main.app) as client:
+            benchenv.create_user(client)
+        insert_varied_tasks(count)
+        with database.SessionLocal() as db:
+            tasks = crud.get_tasks(db, user_id=1)
+
+        bodies = {}
+        for name, serialize in serializers:
+            bodies[name] = serialize(tasks)
+            timing_rows.append([count, name, f"{benchenv.timed(lambda: serialize(tasks), args.repeat):.1f}"])
+        # 生成されるJSONの内容はどの経路でも同じ
+        assert len({json.dumps(json.loads(body)) for body in bodies.values()}) == 1
+
+        body = bodies["TypeAdapter.dump_json"]
+        size_rows.append([count, "identity", len(body), "-"])
+        for encoding in encodings:
+            compressed = compress(body, encoding)
+            elapsed = benchenv.timed(lambda: compress(body, encoding), args.repeat)
+            size_rows.append([count, encoding, len(compressed), f"{elapsed:.1f}"])
+        assert gzip.decompress(compress(body, "gzip")) == body
+
+    print("Serialization (median of", args.repeat, "runs)")
+    benchenv.print_table(["tasks", "serializer", "ms"], timing_rows)
+    print()
+    print(f"Response size (gzip level {settings.compression_gzip_level}, brotli quality {settings.compression_brotli_quality})")
+    benchenv.print_table(["tasks", "encoding", "bytes", "compress ms"], size_rows)
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,62 @@
+import logging
+import os
+import sys
+import tempfile
+import time
+
+# ベンチマーク共通の準備（tests/conftest.py と同じく、アプリの import 前に環境変数で設定を与える）
+# BENCH_DATABASE_URL を指定しなければ SQLite の一時ファイルを使う。
+_db_dir = tempfile.mkdtemp(prefix="todo-bench-")
+os.environ["DATABASE_URL"] = os.environ.get("BENCH_DATABASE_URL") or f"sqlite:///{os.path.join(_db_dir, 'bench.db')}"
+os.environ.setdefault("ENVIRONMENT", "test")
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret-key")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ.setdefault("CACHE_BACKEND", "local")
+os.environ.setdefault("USE_ASYNC_DB", "false")
+
+# リクエストごとのログがベンチの出力に混ざらないようにする
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def reset_database():
+    """テーブルを作り直す"""
+    import database, models
+    models.Base.metadata.drop_all(bind=database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+
+def create_user(client, username: str = "bench") -> dict:
+    """ユーザーを登録し、認証ヘッダーを返す（client は TestClient）"""
+    response = client.post("/auth/register", json={
+        "email": f"{username}@example.com", "username": username, "password": "Passw0rd!x",
+    })
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+def insert_tasks(user_id: int, count: int, chunk_size: int = 10000, **fields):
+    """タスクを直接INSERT（大量件数でもメモリを使わないよう分割）"""
+    import database, models
+    with database.engine.begin() as conn:
+        for start in range(0, count, chunk_size):
+            conn.execute(models.Task.__table__.insert(), [
+                dict({"user_id": user_id, "title": f"Task {index}", "description": "lorem ipsum dolor sit amet"}, **fields)
+                for index in range(start, min(start + chunk_size, count))
+            ])
+
+def timed(func, repeat: int) -> float:
+    """func を repeat 回実行し、1回あたりの中央値（ミリ秒）を返す"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
+
+def print_table(headers: list, rows: list):
+    """結果をMarkdownの表として出力"""
+    print("| " + " | ".join(headers) + " |")
+    print("|" + "|".join("---" for _ in headers) + "|")
+    for row in rows:
+        print("| " + " | ".join(str(value) for value in row) + " |")
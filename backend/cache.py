@@ -0,0 +1,116 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+import models
+from config.settings import settings
+
+class LocalTTLCache:
+    """プロセス内のTTL付きLRUキャッシュ"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        """値を保存（ttl を指定した場合はそのエントリのみ有効期限を上書き）"""
+        if ttl is None:
+            ttl = self.ttl
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+class RedisCache:
+    """Redis互換サーバーを使う共有キャッシュ（複数ワーカー間で整合させる場合）"""
+
+    def __init__(self, url: str, ttl: float, prefix: str):
+        import redis  # 任意依存: USER_CACHE_BACKEND=redis の場合のみ必要
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key) -> Optional[Any]:
+        raw = self._client.get(f"{self.prefix}{key}")
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        """値を保存（ttl を指定した場合はそのエントリのみ有効期限を上書き）"""
+        if ttl is None:
+            ttl = self.ttl
+        self._client.set(f"{self.prefix}{key}", pickle.dumps(value), px=max(1, int(ttl * 1000)))
+
+    def delete(self, key):
+        self._client.delete(f"{self.prefix}{key}")
+
+    def clear(self):
+        for key in self._client.scan_iter(f"{self.prefix}*"):
+            self._client.delete(key)
+
+def create_cache_backend(prefix: str, maxsize: int, ttl: float):
+    """設定に応じたキャッシュバックエンドを生成"""
+    if settings.cache_backend == "redis":
+        return RedisCache(settings.cache_redis_url, ttl=ttl, prefix=prefix)
+    return LocalTTLCache(maxsize=maxsize, ttl=ttl)
+
+class UserCache:
+    """認証済みユーザー行のキャッシュ（ユーザーIDがキー）
+
+    ORMインスタンスはセッションに紐づくため、列の値だけを保持し、
+    取得時に未接続の models.User を組み立てて返す。
+    パスワードハッシュはキャッシュしない。
+    """
+
+    EXCLUDED_COLUMNS = {"hashed_password"}
+
+    def __init__(self, backend=None):
+        self.backend = backend
+
+    def get(self, user_id: int) -> Optional[models.User]:
+        if self.backend is None:
+            return None
+        values = self.backend.get(user_id)
+        return models.User(**values) if values is not None else None
+
+    def set(self, user: models.User):
+        if self.backend is None:
+            return
+        values = {
+            column.key: getattr(user, column.key)
+            for column in models.User.__table__.columns
+            if column.key not in self.EXCLUDED_COLUMNS
+        }
+        self.backend.set(user.id, values)
+
+    def invalidate(self, user_id: int):
+        if self.backend is not None:
+            self.backend.delete(user_id)
+
+user_cache = UserCache(
+    create_cache_backend("user:", settings.user_cache_size, settings.user_cache_ttl)
+    if settings.user_cache_enabled else None
+)
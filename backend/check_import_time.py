@@ -0,0 +1,75 @@
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+# main.py の import 時間を python -X importtime で計測し、予算を超えたら失敗する（CIで使用）
+# 例: python check_import_time.py --budget-ms 1500
+
+def measure(module: str, env: dict) -> List[Tuple[int, str, int]]:
+    """module を新しいプロセスで import し、(深さ, モジュール名, 累積マイクロ秒) の一覧を出力順に返す"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"Failed to import {module}")
+    
+    entries = []
+    for line in result.stderr.splitlines():
+        # 形式: "import time:  self [us] | cumulative | imported package"（入れ子は2文字ずつ字下げ）
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # ヘッダー行
+        name = name[1:].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, name.strip(), int(cumulative)))
+    return entries
+
+def module_imports(entries: List[Tuple[int, str, int]], module: str) -> Tuple[int, List[Tuple[str, int]]]:
+    """module の累積時間と、module が直接 import したモジュールの一覧を返す"""
+    for index, (depth, name, cumulative) in enumerate(entries):
+        if depth == 0 and name == module:
+            break
+    else:
+        raise SystemExit(f"{module} was already imported before measurement")
+    
+    # 子の行は親の行より前に出力される
+    children = []
+    for depth, name, child_cumulative in reversed(entries[:index]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((name, child_cumulative))
+    return cumulative, children
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of the backend against a budget")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500")))
+    parser.add_argument("--runs", type=int, default=3, help="計測回数（最小値で判定してノイズを抑える）")
+    parser.add_argument("--top", type=int, default=15, help="表示する遅いモジュールの数")
+    args = parser.parse_args()
+    
+    # LAZY_INIT（コールドスタート向けの構成）で計測する
+    env = dict(os.environ, LAZY_INIT=os.getenv("LAZY_INIT", "true"))
+    total, children = min(
+        (module_imports(measure(args.module, env), args.module) for _ in range(args.runs)),
+        key=lambda result: result[0]
+    )
+    total_ms = total / 1000
+    
+    print(f"Slowest imports from {args.module} (cumulative, best of {args.runs} runs):")
+    for name, cumulative in sorted(children, key=lambda child: child[1], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    print(f"import {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    
+    if total_ms > args.budget_ms:
+        raise SystemExit(f"import {args.module} exceeded the budget by {total_ms - args.budget_ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,35 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, or_
-from typing import Optional
-from passlib.context import CryptContext
-from datetime import datetime
+from sqlalchemy.orm import Session, joinedload, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy import desc, or_, and_, case, func, select, insert, update, delete, literal, literal_column, String
+from sqlalchemy.exc import IntegrityError
+from typing import Optional, Tuple
+from datetime import datetime, timedelta, timezone
+import base64
+import re
 import models, schemas
+from cache import user_cache
+from config.settings import settings
+import passwords
 
-# パスワードハッシュ化
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# パスワードハッシュ化（passwords の専用ワーカープールで実行）
+pwd_context = passwords.pwd_context
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """パスワードを検証"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return passwords.verify_password(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """パスワードをハッシュ化"""
-    return pwd_context.hash(password)
+    return passwords.hash_password(password)
+
+def with_returning(stmt, model):
+    """INSERT/UPDATE 文に RETURNING を付け、書き込み後の行をORMオブジェクトとして受け取る
+
+    書き込み後の SELECT（refresh）を不要にし、書き込み1文で結果を得る。
+    SessionLocal は expire_on_commit=False のため、commit 後も再読込は発生しない。
+    """
+    return stmt.returning(model).execution_options(populate_existing=True)
 
 # User CRUD operations
 def get_user_by_email(db: Session, email: str):
@@ -29,62 +44,195 @@ def get_user_by_id(db: Session, user_id: int):
     """IDでユーザーを取得"""
     return db.query(models.User).filter(models.User.id == user_id).first()
 
-def create_user(db: Session, user: schemas.UserCreate):
-    """新規ユーザーを作成"""
-    hashed_password = get_password_hash(user.password)
-    db_user = models.User(
+def create_user(db: Session, user: schemas.UserCreate, record_login: bool = False,
+                hashed_password: Optional[str] = None):
+    """新規ユーザーを作成（INSERT ... RETURNING で作成後の行を1往復で取得）
+
+    record_login を指定した場合は最終ログイン時刻も同じINSERTで設定する。
+    hashed_password を渡した場合はそれを使う（async エンドポイントで事前にハッシュ化した場合）。
+    メールアドレス・ユーザー名の重複は一意制約の IntegrityError で検出する
+    （unique_violation_field で項目を判定）。
+    """
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
+    values = dict(
         email=user.email,
         username=user.username,
         full_name=user.full_name,
         hashed_password=hashed_password
     )
-    db.add(db_user)
+    if record_login:
+        values["last_login"] = func.now()
+    
+    db_user = db.execute(with_returning(insert(models.User).values(**values), models.User)).scalar_one()
     db.commit()
-    db.refresh(db_user)
     return db_user
 
-def authenticate_user(db: Session, email: str, password: str):
-    """ユーザー認証"""
-    user = get_user_by_email(db, email)
-    if not user or not verify_password(password, user.hashed_password):
-        return False
+def complete_login(db: Session, user: models.User, new_hash: Optional[str] = None, record_login: bool = False):
+    """パスワード検証済みユーザーのログインを保存
+
+    ハッシュのコスト等が古い場合の再ハッシュと、record_login 指定時の最終ログイン時刻は
+    UPDATE ... RETURNING の1文でまとめて保存する（無効なユーザーのログイン時刻は記録しない）。
+    """
+    values = {}
+    if new_hash:
+        values["hashed_password"] = new_hash
+    if record_login and user.is_active:
+        values["last_login"] = func.now()
+    if not values:
+        return user
+    
+    user = db.execute(with_returning(
+        update(models.User).where(models.User.id == user.id).values(**values),
+        models.User
+    )).scalar_one()
+    db.commit()
+    user_cache.invalidate(user.id)
     return user
 
-def update_user_last_login(db: Session, user_id: int):
-    """最終ログイン時刻を更新"""
-    db_user = get_user_by_id(db, user_id)
-    if db_user:
-        db_user.last_login = datetime.utcnow()
-        db.commit()
-        db.refresh(db_user)
-    return db_user
+def bulk_update_last_login(db: Session, last_logins: dict):
+    """{ユーザーID: ログイン時刻} を CASE 式の1文のUPDATEで反映"""
+    if not last_logins:
+        return
+    db.execute(
+        update(models.User)
+        .where(models.User.id.in_(list(last_logins)))
+        .values(last_login=case(last_logins, value=models.User.id))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    for user_id in last_logins:
+        user_cache.invalidate(user_id)
 
-def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate):
-    """ユーザー情報を更新"""
-    db_user = get_user_by_id(db, user_id)
-    if not db_user:
-        return None
-    
+def unique_violation_field(error: IntegrityError, fields=("email", "username")) -> Optional[str]:
+    """一意制約違反の IntegrityError から重複した項目名を判定（不明な場合は None）
+
+    PostgreSQL は制約名（ix_users_email / users_email_key 等）、
+    SQLite はエラーメッセージ（UNIQUE constraint failed: users.email）から判定する。
+    """
+    diag = getattr(error.orig, "diag", None)
+    constraint = getattr(diag, "constraint_name", None)
+    message = str(error.orig)
+    for field in fields:
+        if constraint:
+            if re.search(rf"(^|_){field}(_key)?$", constraint):
+                return field
+        elif re.search(rf"\.{field}\b", message):
+            return field
+    return None
+
+def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate,
+                hashed_password: Optional[str] = None):
+    """ユーザー情報を更新（hashed_password を渡した場合は新しいパスワードのハッシュとして使う）"""
     update_data = user_update.model_dump(exclude_unset=True)
+    if not update_data:
+        return get_user_by_id(db, user_id)
     
     # パスワードがある場合はハッシュ化
     if "password" in update_data:
-        update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
-    
-    for key, value in update_data.items():
-        setattr(db_user, key, value)
+        password = update_data.pop("password")
+        update_data["hashed_password"] = hashed_password or get_password_hash(password)
     
+    db_user = db.execute(with_returning(
+        update(models.User).where(models.User.id == user_id).values(**update_data),
+        models.User
+    )).scalar_one_or_none()
+    db.commit()
+    if db_user:
+        user_cache.invalidate(user_id)
+    return db_user
+
+def set_user_active(db: Session, user_id: int, is_active: bool):
+    """ユーザーの有効/無効を切り替え（無効化は認証キャッシュにも即時反映）"""
+    db_user = db.execute(with_returning(
+        update(models.User).where(models.User.id == user_id).values(is_active=is_active),
+        models.User
+    )).scalar_one_or_none()
     db.commit()
-    db.refresh(db_user)
+    if db_user:
+        user_cache.invalidate(user_id)
     return db_user
 
+# Data version operations
+# タスク・カテゴリを変更するたびにユーザーの data_version を加算し、
+# 一覧・詳細のETagをORM行を読み込まずに判定できるようにする
+def data_version_bump(user_id: int):
+    """data_version を加算するUPDATE文（users.updated_at は変更しない）"""
+    return (
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(data_version=models.User.data_version + 1, updated_at=models.User.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+def bump_data_version(db: Session, user_id: int):
+    """data_version を加算（呼び出し側のトランザクション内でコミットされる）"""
+    db.execute(data_version_bump(user_id))
+
+def get_data_version(db: Session, user_id: int) -> int:
+    """ユーザーの data_version を取得"""
+    return db.execute(
+        select(models.User.data_version).where(models.User.id == user_id)
+    ).scalar() or 0
+
 # Task CRUD operations
-def get_tasks(db: Session, user_id: int, search: Optional[str] = None, category_id: Optional[int] = None, 
-              priority: Optional[int] = None, is_completed: Optional[bool] = None):
-    """ユーザーのタスクを条件付きで取得"""
-    query = db.query(models.Task).filter(models.Task.user_id == user_id)
+def _task_query(db: Session):
+    """カテゴリを同一クエリでJOINして読み込むタスククエリ（N+1防止）"""
+    return db.query(models.Task).options(joinedload(models.Task.category))
+
+def encode_task_cursor(task: models.Task) -> str:
+    """タスクの (created_at, id) からページングカーソルを生成"""
+    raw = f"{task.created_at.isoformat()}|{task.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_task_cursor(cursor: str) -> Tuple[datetime, int]:
+    """ページングカーソルを (created_at, id) に復元（不正な場合は ValueError）"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, task_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(task_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+def _cursor_created_at(dialect_name: str, created_at: datetime):
+    """カーソルの created_at を列の保存値と比較できる形でバインド
+
+    SQLite は日時を文字列として比較する。CURRENT_TIMESTAMP で保存された値（秒まで）と
+    SQLAlchemy の既定形式（マイクロ秒付き）では同じ時刻でも大小が一致しないため、
+    保存値と同じ精度の文字列にそろえる。
+    """
+    if dialect_name != "sqlite":
+        return created_at
+    value = created_at.strftime("%Y-%m-%d %H:%M:%S")
+    if created_at.microsecond:
+        value += f".{created_at.microsecond:06d}"
+    return literal(value, type_=String)
+
+def _search_rank(dialect_name: str, search: str):
+    """検索キーワードに対する関連度（大きいほど上位）
+
+    PostgreSQL では pg_trgm の similarity を使い、それ以外（SQLite等）では
+    タイトル一致 > 説明一致 の簡易スコアで代替する。
+    """
+    if dialect_name == "postgresql":
+        return (
+            func.similarity(models.Task.title, search) * 2
+            + func.similarity(func.coalesce(models.Task.description, ""), search)
+        )
+    return case(
+        (models.Task.title.ilike(f"%{search}%"), 2),
+        else_=1
+    )
+
+def filter_tasks(query, dialect_name: str, user_id: int, search: Optional[str] = None,
+                 category_id: Optional[int] = None, priority: Optional[int] = None,
+                 is_completed: Optional[bool] = None, limit: Optional[int] = None,
+                 cursor: Optional[str] = None, ranked: bool = False):
+    """タスク一覧の絞り込み・並び替え・ページングを適用（Query / select の両方に対応）"""
+    query = query.filter(models.Task.user_id == user_id)
     
     if search:
+        # PostgreSQL では pg_trgm の GIN インデックス（004_add_task_search_indexes）が使われる
         query = query.filter(or_(
             models.Task.title.ilike(f"%{search}%"),
             models.Task.description.ilike(f"%{search}%")
@@ -99,60 +247,346 @@ def get_tasks(db: Session, user_id: int, search: Optional[str] = None, category_
     if is_completed is not None:
         query = query.filter(models.Task.is_completed == is_completed)
     
-    return query.order_by(desc(models.Task.created_at)).all()
+    if cursor:
+        cursor_created_at, cursor_id = decode_task_cursor(cursor)
+        cursor_created_at = _cursor_created_at(dialect_name, cursor_created_at)
+        # created_at <= カーソル の条件を重ねて、インデックスをカーソル位置から範囲検索させる
+        query = query.filter(
+            models.Task.created_at <= cursor_created_at,
+            or_(
+                models.Task.created_at < cursor_created_at,
+                and_(models.Task.created_at == cursor_created_at, models.Task.id < cursor_id)
+            )
+        )
+    
+    if search and ranked:
+        query = query.order_by(desc(_search_rank(dialect_name, search)), desc(models.Task.created_at), desc(models.Task.id))
+    else:
+        query = query.order_by(desc(models.Task.created_at), desc(models.Task.id))
+    
+    if limit is not None:
+        query = query.limit(limit)
+    
+    return query
+
+def get_tasks(db: Session, user_id: int, search: Optional[str] = None, category_id: Optional[int] = None, 
+              priority: Optional[int] = None, is_completed: Optional[bool] = None,
+              limit: Optional[int] = None, cursor: Optional[str] = None, ranked: bool = False):
+    """ユーザーのタスクを条件付きで取得
+
+    limit を指定した場合は (created_at, id) のキーセットページングで
+    最大 limit 件を返す。cursor は前ページの next_cursor。
+    ranked を指定した場合は search の関連度順に並べる（ページング不可）。
+    """
+    query = filter_tasks(
+        _task_query(db), db.get_bind().dialect.name, user_id=user_id, search=search,
+        category_id=category_id, priority=priority, is_completed=is_completed,
+        limit=limit, cursor=cursor, ranked=ranked
+    )
+    return query.all()
+
+def paginate_tasks(tasks: list, limit: int):
+    """limit + 1 件取得した結果を1ページ分と next_cursor に分割"""
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = encode_task_cursor(tasks[-1])
+    return tasks, next_cursor
+
+def get_task_page(db: Session, user_id: int, limit: int, cursor: Optional[str] = None, **filters):
+    """キーセットページングでタスクを1ページ分取得し、(tasks, next_cursor) を返す"""
+    # 1件多く取得して次ページの有無を判定
+    tasks = get_tasks(db, user_id=user_id, limit=limit + 1, cursor=cursor, **filters)
+    return paginate_tasks(tasks, limit)
 
 def get_task(db: Session, task_id: int, user_id: int):
     """ユーザーの特定のタスクを取得"""
-    return db.query(models.Task).filter(
+    return _task_query(db).filter(
         models.Task.id == task_id, 
         models.Task.user_id == user_id
     ).first()
 
+# タスクの INSERT/UPDATE の RETURNING に含めるカテゴリの列
+# （RETURNING 内ではSQLAlchemyが相関サブクエリを組み立てられないため、列名を明示する）
+_returned_category = models.Category.__table__.alias("returned_category")
+_returned_category_match = (
+    literal_column(f"{_returned_category.name}.id")
+    == literal_column(f"{models.Task.__tablename__}.category_id")
+)
+RETURNED_CATEGORY_COLUMNS = [
+    select(column).select_from(_returned_category).where(_returned_category_match)
+    .scalar_subquery().label(f"category_{column.key}")
+    for column in _returned_category.c if column.key != "id"
+]
+
+def task_returning(stmt):
+    """タスクの INSERT/UPDATE に、タスクとカテゴリの列を返す RETURNING を付ける
+
+    書き込み後に categories を遅延ロードすると1往復増えるため、
+    カテゴリの列をスカラーサブクエリとして同じ文で返す（PostgreSQL / SQLite 共通）。
+    """
+    return stmt.returning(models.Task, *RETURNED_CATEGORY_COLUMNS).execution_options(populate_existing=True)
+
+def attach_returned_category(db: Session, row):
+    """task_returning の結果行からタスクを取り出し、カテゴリをSQLなしで設定（AsyncSession も可）"""
+    db_task, *values = row
+    category = None
+    if db_task.category_id is not None:
+        key = identity_key(models.Category, db_task.category_id)
+        category = db.identity_map.get(key)
+        if category is None:
+            columns = [column.key for column in _returned_category.c if column.key != "id"]
+            category = models.Category(id=db_task.category_id, **dict(zip(columns, values)))
+            # 既存の行として（INSERTせずに）セッションに登録
+            make_transient_to_detached(category)
+            db.add(category)
+    set_committed_value(db_task, "category", category)
+    return db_task
+
 def create_task(db: Session, task: schemas.TaskCreate, user_id: int):
-    """新規タスクを作成"""
-    db_task = models.Task(
-        title=task.title,
-        description=task.description,
-        priority=task.priority,
-        due_date=task.due_date,
-        category_id=task.category_id,
-        user_id=user_id
-    )
-    db.add(db_task)
+    """新規タスクを作成（カテゴリも同じ INSERT ... RETURNING で取得）"""
+    row = db.execute(task_returning(
+        insert(models.Task).values(
+            title=task.title,
+            description=task.description,
+            priority=task.priority,
+            due_date=task.due_date,
+            category_id=task.category_id,
+            user_id=user_id
+        )
+    )).one()
+    db_task = attach_returned_category(db, row)
+    bump_data_version(db, user_id)
     db.commit()
-    db.refresh(db_task)
     return db_task
 
 def update_task(db: Session, task_id: int, task: schemas.TaskUpdate, user_id: int):
-    """タスクを更新"""
-    db_task = db.query(models.Task).filter(
-        models.Task.id == task_id,
-        models.Task.user_id == user_id
-    ).first()
-    if db_task is None:
-        return None
-    
+    """タスクを更新（所有者の条件付き UPDATE ... RETURNING の1文で更新とカテゴリを含む読み戻しを行う）"""
     update_data = task.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_task, key, value)
+    if not update_data:
+        return get_task(db, task_id=task_id, user_id=user_id)
+    
+    row = db.execute(task_returning(
+        update(models.Task)
+        .where(models.Task.id == task_id, models.Task.user_id == user_id)
+        .values(**update_data)
+    )).one_or_none()
+    if row is None:
+        db.rollback()
+        return None
     
+    db_task = attach_returned_category(db, row)
+    bump_data_version(db, user_id)
     db.commit()
-    db.refresh(db_task)
     return db_task
 
 def delete_task(db: Session, task_id: int, user_id: int):
-    """タスクを削除"""
-    db_task = db.query(models.Task).filter(
-        models.Task.id == task_id,
-        models.Task.user_id == user_id
-    ).first()
-    if db_task is None:
+    """タスクを削除（事前のSELECTを行わず、削除件数で存在を判定）"""
+    result = db.execute(
+        delete(models.Task)
+        .where(models.Task.id == task_id, models.Task.user_id == user_id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.rollback()
         return False
     
-    db.delete(db_task)
+    record_deletions(db, user_id=user_id, entity_type="task", entity_ids=[task_id])
+    bump_data_version(db, user_id)
     db.commit()
     return True
 
+def get_task_stats(db: Session, user_id: int):
+    """タスクの集計（件数・完了数・期限切れ・優先度別・カテゴリ別）を1回のGROUP BYで取得"""
+    overdue = case(
+        (and_(models.Task.due_date < func.now(), models.Task.is_completed.isnot(True)), 1),
+        else_=0
+    )
+    # priority は NULL でも保存できるため、既定値（2=Medium）として数える
+    priority = func.coalesce(models.Task.priority, 2)
+    rows = db.execute(
+        select(
+            models.Task.category_id,
+            priority,
+            models.Task.is_completed,
+            func.count(models.Task.id),
+            func.sum(overdue)
+        )
+        .where(models.Task.user_id == user_id)
+        .group_by(models.Task.category_id, priority, models.Task.is_completed)
+    ).all()
+    
+    stats = {"total": 0, "completed": 0, "overdue": 0, "by_priority": {}, "by_category": {}}
+    for category_id, priority, is_completed, count, overdue_count in rows:
+        completed = count if is_completed else 0
+        stats["total"] += count
+        stats["completed"] += completed
+        stats["overdue"] += overdue_count or 0
+        stats["by_priority"][priority] = stats["by_priority"].get(priority, 0) + count
+        category = stats["by_category"].setdefault(category_id, {"category_id": category_id, "total": 0, "completed": 0})
+        category["total"] += count
+        category["completed"] += completed
+    
+    stats["active"] = stats["total"] - stats["completed"]
+    stats["by_category"] = list(stats["by_category"].values())
+    return stats
+
+def iter_task_export_rows(db: Session, user_id: int, batch_size: int = 1000):
+    """エクスポート用にタスク行をバッチ単位で返す（ORMオブジェクトを生成しない）
+
+    yield_per によりサーバーサイドカーソルで読み出すため、全件をメモリに載せない。
+    """
+    stmt = (
+        select(
+            models.Task.id,
+            models.Task.title,
+            models.Task.description,
+            models.Task.is_completed,
+            models.Task.priority,
+            models.Task.due_date,
+            models.Task.category_id,
+            models.Category.name,
+            models.Task.created_at,
+            models.Task.updated_at,
+        )
+        .outerjoin(models.Category, models.Task.category_id == models.Category.id)
+        .where(models.Task.user_id == user_id)
+        .order_by(models.Task.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for partition in db.execute(stmt).partitions():
+        yield partition
+
+def upsert_categories(db: Session, user_id: int, names: set) -> Tuple[dict, int]:
+    """カテゴリ名をIDに解決し、存在しないものは作成する
+
+    unique_category_per_user 制約に対する INSERT ... ON CONFLICT DO NOTHING を1回、
+    IDの取得に SELECT を1回だけ発行する。(名前 -> ID, 新規作成数) を返す。
+    """
+    if not names:
+        return {}, 0
+    
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as upsert_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as upsert_insert
+    
+    result = db.execute(
+        upsert_insert(models.Category)
+        .values([{"name": name, "user_id": user_id} for name in names])
+        .on_conflict_do_nothing()
+    )
+    rows = db.execute(
+        select(models.Category.name, models.Category.id).where(
+            models.Category.user_id == user_id,
+            models.Category.name.in_(names)
+        )
+    ).all()
+    return dict(rows), max(result.rowcount, 0)
+
+def bulk_insert_tasks(db: Session, user_id: int, rows: list):
+    """タスクを executemany でまとめて追加（呼び出し側でコミット）"""
+    if rows:
+        db.execute(insert(models.Task), [dict(row, user_id=user_id) for row in rows])
+
+def last_task_id(db: Session) -> int:
+    """現在の最大のタスクID（タスクがなければ0）"""
+    return db.execute(select(func.coalesce(func.max(models.Task.id), 0))).scalar()
+
+def touch_imported(db: Session, user_id: int, after_task_id: int, category_ids):
+    """インポートで追加したタスク（after_task_id より大きいID）とカテゴリの updated_at を現在時刻にする
+
+    PostgreSQL の now() はトランザクション開始時刻のため、長いインポートの行はコミット時点で
+    既に古い updated_at を持ち、インポート中に同期トークンを受け取ったクライアントの差分に載らない。
+    コミット直前に実時刻（clock_timestamp()）で付け直し、残る数ミリ秒の差は SYNC_OVERLAP で吸収する。
+    """
+    stamp = func.clock_timestamp() if db.get_bind().dialect.name == "postgresql" else func.now()
+    db.execute(
+        update(models.Task)
+        .where(models.Task.user_id == user_id, models.Task.id > after_task_id)
+        .values(updated_at=stamp)
+        .execution_options(synchronize_session=False)
+    )
+    if category_ids:
+        db.execute(
+            update(models.Category)
+            .where(models.Category.user_id == user_id, models.Category.id.in_(category_ids))
+            .values(updated_at=stamp)
+            .execution_options(synchronize_session=False)
+        )
+
+def apply_task_batch(db: Session, batch: schemas.TaskBatchRequest, user_id: int):
+    """タスクの作成・更新・削除を1トランザクションでまとめて適用
+
+    行ごとのSELECT/commit/refreshを行わず、集合指向のSQLで処理する:
+    - 作成: executemany の INSERT ... RETURNING id
+    - 更新: 同じ内容の更新をまとめて UPDATE ... WHERE id IN (...)
+    - 削除: DELETE ... WHERE id IN (...)
+    対象タスクが存在しない（他ユーザーのものを含む）項目は not_found を返す。
+    """
+    results = []
+    
+    # 更新・削除対象のうち、このユーザーが所有するIDを1回で取得
+    target_ids = {item.id for item in batch.update} | set(batch.delete)
+    owned_ids = set()
+    if target_ids:
+        owned_ids = set(db.execute(
+            select(models.Task.id).where(
+                models.Task.user_id == user_id,
+                models.Task.id.in_(target_ids)
+            )
+        ).scalars())
+    
+    if batch.create:
+        rows = [dict(task.model_dump(), user_id=user_id) for task in batch.create]
+        created_ids = db.execute(
+            insert(models.Task).returning(models.Task.id, sort_by_parameter_order=True),
+            rows
+        ).scalars().all()
+        for index, task_id in enumerate(created_ids):
+            results.append({"op": "create", "index": index, "id": task_id, "status": "ok"})
+    
+    # 同じ更新内容ごとにグループ化して1文で更新
+    update_groups = {}
+    for index, item in enumerate(batch.update):
+        if item.id not in owned_ids:
+            results.append({"op": "update", "index": index, "id": item.id, "status": "not_found"})
+            continue
+        values = item.model_dump(exclude_unset=True, exclude={"id"})
+        key = tuple(sorted(values.items()))
+        update_groups.setdefault(key, []).append(item.id)
+        results.append({"op": "update", "index": index, "id": item.id, "status": "ok"})
+    
+    for key, ids in update_groups.items():
+        if not key:
+            continue
+        db.execute(
+            update(models.Task)
+            .where(models.Task.user_id == user_id, models.Task.id.in_(ids))
+            .values(dict(key))
+            .execution_options(synchronize_session=False)
+        )
+    
+    delete_ids = []
+    for index, task_id in enumerate(batch.delete):
+        status = "ok" if task_id in owned_ids else "not_found"
+        if status == "ok":
+            delete_ids.append(task_id)
+        results.append({"op": "delete", "index": index, "id": task_id, "status": status})
+    
+    if delete_ids:
+        db.execute(
+            delete(models.Task)
+            .where(models.Task.user_id == user_id, models.Task.id.in_(delete_ids))
+            .execution_options(synchronize_session=False)
+        )
+        record_deletions(db, user_id=user_id, entity_type="task", entity_ids=delete_ids)
+    
+    bump_data_version(db, user_id)
+    db.commit()
+    return results
+
 # Category CRUD operations
 def get_categories(db: Session, user_id: int):
     """ユーザーのカテゴリを取得"""
@@ -169,48 +603,128 @@ def get_category(db: Session, category_id: int, user_id: int):
 
 def create_category(db: Session, category: schemas.CategoryCreate, user_id: int):
     """新規カテゴリを作成"""
-    db_category = models.Category(
-        name=category.name, 
-        color=category.color,
-        user_id=user_id
-    )
-    db.add(db_category)
+    db_category = db.execute(with_returning(
+        insert(models.Category).values(
+            name=category.name,
+            color=category.color,
+            user_id=user_id
+        ),
+        models.Category
+    )).scalar_one()
+    bump_data_version(db, user_id)
     db.commit()
-    db.refresh(db_category)
     return db_category
 
 def update_category(db: Session, category_id: int, category: schemas.CategoryUpdate, user_id: int):
     """カテゴリを更新"""
-    db_category = db.query(models.Category).filter(
-        models.Category.id == category_id,
-        models.Category.user_id == user_id
-    ).first()
+    update_data = category.model_dump(exclude_unset=True)
+    if not update_data:
+        return get_category(db, category_id=category_id, user_id=user_id)
+    
+    db_category = db.execute(with_returning(
+        update(models.Category)
+        .where(models.Category.id == category_id, models.Category.user_id == user_id)
+        .values(**update_data),
+        models.Category
+    )).scalar_one_or_none()
     if db_category is None:
+        db.rollback()
         return None
     
-    update_data = category.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_category, key, value)
-    
+    bump_data_version(db, user_id)
     db.commit()
-    db.refresh(db_category)
     return db_category
 
 def delete_category(db: Session, category_id: int, user_id: int):
-    """カテゴリを削除"""
-    db_category = db.query(models.Category).filter(
-        models.Category.id == category_id,
-        models.Category.user_id == user_id
-    ).first()
-    if db_category is None:
-        return False
-    
+    """カテゴリを削除（事前のSELECTを行わず、削除件数で存在を判定）"""
     # カテゴリに属するタスクのcategory_idをNullに設定
-    db.query(models.Task).filter(
-        models.Task.category_id == category_id,
-        models.Task.user_id == user_id
-    ).update({models.Task.category_id: None})
+    db.execute(
+        update(models.Task)
+        .where(models.Task.category_id == category_id, models.Task.user_id == user_id)
+        .values(category_id=None)
+        .execution_options(synchronize_session=False)
+    )
     
-    db.delete(db_category)
+    result = db.execute(
+        delete(models.Category)
+        .where(models.Category.id == category_id, models.Category.user_id == user_id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.rollback()
+        return False
+    
+    record_deletions(db, user_id=user_id, entity_type="category", entity_ids=[category_id])
+    bump_data_version(db, user_id)
     db.commit()
-    return True
\ No newline at end of file
+    return True
+
+# Sync operations
+# 同期トークン発行時刻より前に開始し、後でコミットされた変更を取りこぼさないよう
+# 発行時刻からこの分だけ遡って差分を返す（クライアント側は重複を上書きするだけ）
+SYNC_OVERLAP = timedelta(seconds=5)
+
+def encode_sync_token(timestamp: datetime) -> str:
+    """同期時刻から同期トークンを生成"""
+    return base64.urlsafe_b64encode(timestamp.isoformat().encode()).decode()
+
+def decode_sync_token(token: str) -> datetime:
+    """同期トークンを時刻に復元（不正な場合は ValueError）"""
+    try:
+        return datetime.fromisoformat(base64.urlsafe_b64decode(token.encode()).decode())
+    except Exception as e:
+        raise ValueError("Invalid sync token") from e
+
+def tombstone_prune(user_id: int):
+    """保持期間を過ぎた削除記録を消すDELETE文
+
+    同期（GET /api/sync）のたびに書き込まないよう、削除記録を追加する削除処理の中で実行する。
+    """
+    retention_start = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=settings.sync_tombstone_retention_days)
+    return (
+        delete(models.SyncTombstone)
+        .where(models.SyncTombstone.user_id == user_id, models.SyncTombstone.deleted_at < retention_start)
+        .execution_options(synchronize_session=False)
+    )
+
+def record_deletions(db: Session, user_id: int, entity_type: str, entity_ids: list):
+    """削除記録を追加し、保持期間を過ぎた記録を整理（呼び出し側のトランザクション内でコミットされる）"""
+    db.execute(insert(models.SyncTombstone), [
+        {"user_id": user_id, "entity_type": entity_type, "entity_id": entity_id}
+        for entity_id in entity_ids
+    ])
+    db.execute(tombstone_prune(user_id))
+
+def get_changes(db: Session, user_id: int, since: Optional[datetime], retention_days: int):
+    """since 以降に作成・更新・削除されたタスクとカテゴリを取得
+
+    since が None、または削除記録の保持期間より古い場合は全件を返す（full=True）。
+    """
+    now = db.execute(select(func.now())).scalar()
+    retention_start = now - timedelta(days=retention_days)
+    full = since is None or since < retention_start
+    
+    tasks = _task_query(db).filter(models.Task.user_id == user_id)
+    categories = db.query(models.Category).filter(models.Category.user_id == user_id)
+    deleted_task_ids = []
+    deleted_category_ids = []
+    
+    if not full:
+        window_start = since - SYNC_OVERLAP
+        tasks = tasks.filter(models.Task.updated_at > window_start)
+        categories = categories.filter(models.Category.updated_at > window_start)
+        tombstones = db.query(models.SyncTombstone.entity_type, models.SyncTombstone.entity_id).filter(
+            models.SyncTombstone.user_id == user_id,
+            models.SyncTombstone.deleted_at > window_start
+        ).all()
+        deleted_task_ids = [entity_id for entity_type, entity_id in tombstones if entity_type == "task"]
+        deleted_category_ids = [entity_id for entity_type, entity_id in tombstones if entity_type == "category"]
+    
+    return {
+        "tasks": tasks.order_by(models.Task.updated_at).all(),
+        "categories": categories.order_by(models.Category.name).all(),
+        "deleted_task_ids": deleted_task_ids,
+        "deleted_category_ids": deleted_category_ids,
+        "next_token": encode_sync_token(now),
+        "full": full,
+    }
\ No newline at end of file
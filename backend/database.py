@@ -1,20 +1,177 @@
+import logging
+import os
+import threading
+import time
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
 # データベースURL
 DATABASE_URL = settings.database_url
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class PoolStats:
+    """コネクションプールの待ち時間などの累積統計"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.wait_seconds_total = 0.0
+            self.wait_seconds_max = 0.0
+            self.timeouts = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts_total": self.checkouts,
+                "checkout_timeouts_total": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+            }
+
+pool_stats = PoolStats()
+
+class InstrumentedQueuePool(QueuePool):
+    """チェックアウト待ち時間を計測する QueuePool"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except Exception:
+            pool_stats.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record_wait(time.perf_counter() - start)
+        return conn
+
+def pool_options() -> dict:
+    """設定値からコネクションプールのオプションを生成（SQLiteはデフォルトのまま）"""
+    if DATABASE_URL.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+_options = pool_options()
+if _options:
+    _options["poolclass"] = InstrumentedQueuePool
+engine = create_engine(DATABASE_URL, **_options)
+# 書き込みは RETURNING で結果を受け取るため、commit 後に属性を失効させて再SELECTしない
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
+def _reset_pool_after_fork():
+    """fork後の子プロセスで親のコネクションを共有しないようプールを作り直す"""
+    # close=False: 親プロセスが使用中のソケットは閉じずに破棄する
+    engine.dispose(close=False)
+    pool_stats.reset()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+def get_pool_status() -> dict:
+    """現在のコネクションプールの状態を取得"""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": settings.db_max_overflow,
+            "timeout": pool.timeout(),
+        })
+    status.update(pool_stats.snapshot())
+    return status
+
+# server.py がフォーク前にテーブルを作成済みであることをワーカーに伝える環境変数
+SCHEMA_READY_ENV = "TODO_SCHEMA_READY"
+
+_schema_lock = threading.Lock()
+
+def create_schema():
+    """テーブルを作成（既存のテーブルは変更しない）"""
+    import models
+    models.Base.metadata.create_all(bind=engine)
+    os.environ[SCHEMA_READY_ENV] = "1"
+
+def ensure_schema():
+    """テーブル作成を初回のDB利用時に1回だけ行う（作成済み・無効の場合は何もしない）"""
+    if not settings.db_create_schema or os.environ.get(SCHEMA_READY_ENV):
+        return
+    with _schema_lock:
+        if not os.environ.get(SCHEMA_READY_ENV):
+            create_schema()
+
+def prewarm_pool(connections: int):
+    """テーブル作成を済ませ、指定数の接続を確立してプールに戻しておく"""
+    ensure_schema()
+    opened = []
+    try:
+        for _ in range(min(connections, connections_per_worker())):
+            opened.append(engine.connect())
+    finally:
+        for connection in opened:
+            connection.close()
+
+def start_prewarm(connections: int) -> threading.Thread:
+    """prewarm_pool をバックグラウンドスレッドで実行（起動を待たせない）"""
+    def run():
+        try:
+            prewarm_pool(connections)
+        except Exception:
+            logger.exception("Failed to prewarm database connection pool")
+    
+    thread = threading.Thread(target=run, name="db-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+def connections_per_worker() -> int:
+    """1ワーカーが使うDB接続の上限"""
+    if not pool_options():
+        return 1
+    return settings.db_pool_size + settings.db_max_overflow
+
+def threadpool_size() -> int:
+    """同期エンドポイント用スレッドプール（anyio）のサイズ
+
+    既定ではDBプールの上限に合わせ、スレッドがコネクション待ちで滞留したり
+    プールに余りが出たりしないようにする。
+    """
+    if settings.threadpool_size > 0:
+        return settings.threadpool_size
+    if not pool_options():
+        return 40  # anyio の既定値
+    return connections_per_worker()
+
 # データベース依存関数
 def get_db():
+    ensure_schema()
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
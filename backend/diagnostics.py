@@ -0,0 +1,152 @@
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+
+# 診断モード（DIAGNOSTICS_ENABLED=true の場合のみ有効）
+# - crud モジュールから発行された遅いSQLを、バインドパラメータと呼び出し元ルート付きでログ出力
+# - 一部のリクエストにサンプリングプロファイラを付け、collapsed stack 形式
+#   （flamegraph.pl / speedscope で読み込み可能）でファイルに書き出す
+
+logger = logging.getLogger("diagnostics")
+
+CRUD_MODULES = ("crud", "async_crud")
+MAX_PARAMETER_LENGTH = 1000
+
+_current_scope: ContextVar[Optional[dict]] = ContextVar("diagnostics_scope", default=None)
+
+def _current_route() -> str:
+    scope = _current_scope.get()
+    if scope is None:
+        return "-"
+    route = scope.get("route")
+    return f"{scope.get('method')} {getattr(route, 'path', None) or scope.get('path')}"
+
+def _crud_caller() -> Optional[str]:
+    """SQLを発行した crud モジュールの関数を呼び出しスタックから探す"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__")
+        if module in CRUD_MODULES:
+            return f"{module}.{frame.f_code.co_name}:{frame.f_lineno}"
+        frame = frame.f_back
+    return None
+
+def _format_parameters(statement: str, parameters) -> str:
+    # パスワードハッシュを含む文のパラメータは出力しない
+    if "hashed_password" in statement and re.search(r"\b(INSERT|UPDATE)\b", statement, re.I):
+        return "<redacted>"
+    text = repr(parameters)
+    if len(text) > MAX_PARAMETER_LENGTH:
+        text = text[:MAX_PARAMETER_LENGTH] + "..."
+    return text
+
+def instrument_slow_queries(engine, threshold_ms: float):
+    """threshold_ms を超えた crud 由来のSQLをログ出力"""
+    threshold = threshold_ms / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("diagnostics_start_times", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get("diagnostics_start_times")
+        if not start_times:
+            return
+        elapsed = time.perf_counter() - start_times.pop()
+        if elapsed < threshold:
+            return
+        caller = _crud_caller()
+        if caller is None:
+            return
+        logger.warning(
+            "Slow query %.1fms route=%s caller=%s\n%s\nparameters=%s",
+            elapsed * 1000, _current_route(), caller,
+            statement, _format_parameters(statement, parameters)
+        )
+
+class StackSampler:
+    """全スレッドのスタックを一定間隔で採取し、collapsed stack 形式で集計する
+
+    同期エンドポイントはスレッドプールで実行されるため、特定のスレッドに限定せず
+    イベントループと全ワーカースレッドを採取する（各行の先頭はスレッド名）。
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(part.replace(";", ":") for part in reversed(stack))] += 1
+
+    def write(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+class DiagnosticsMiddleware:
+    """遅いSQLログ用に呼び出し元ルートを記録し、一部のリクエストをプロファイルするASGIミドルウェア"""
+
+    def __init__(self, app, sample_rate: float, output_dir: str, interval: float):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.interval = interval
+        if sample_rate > 0:
+            os.makedirs(output_dir, exist_ok=True)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        token = _current_scope.set(scope)
+        sampler = None
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            sampler = StackSampler(self.interval)
+            sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
+            if sampler is not None:
+                sampler.stop()
+                self._write_profile(scope, sampler)
+
+    def _write_profile(self, scope, sampler: StackSampler):
+        route = getattr(scope.get("route"), "path", None) or scope.get("path", "")
+        name = re.sub(r"[^A-Za-z0-9_-]+", "_", f"{scope.get('method')}_{route}").strip("_")
+        path = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{name}.collapsed")
+        try:
+            sampler.write(path)
+        except OSError as e:
+            logger.warning("プロファイルの書き出しに失敗しました: %s", e)
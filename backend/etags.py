@@ -0,0 +1,45 @@
+import hashlib
+from fastapi import Request, Response
+from config.settings import settings
+
+# 条件付きGET（ETag / If-None-Match）のヘルパー
+# ETagはユーザーごとのレスポンスなので共有キャッシュには保存させない
+CACHE_CONTROL = "private, no-cache"
+
+def version_etag(request: Request, user_id: int, version: int) -> str:
+    """アプリのバージョン・data_version・リクエストURLから強いETagを生成
+
+    アプリのバージョンを含め、デプロイでレスポンスの形式が変わった場合に古いETagで304を返さないようにする。
+    """
+    key = f"{settings.app_version}:{user_id}:{version}:{request.url.path}?{request.url.query}"
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+def body_etag(body: bytes) -> str:
+    """レスポンス本文のハッシュから強いETagを生成"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match が現在のETagと一致するか判定（弱い比較。圧縮時の W/ 付きETagも一致とみなす）"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = [value.strip().removeprefix("W/") for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+def not_modified_response(etag: str) -> Response:
+    """304 Not Modified レスポンス"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+def set_etag_headers(response: Response, etag: str):
+    """通常のレスポンスにETag関連のヘッダーを設定"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+def json_response_with_etag(request: Request, body: bytes) -> Response:
+    """JSON本文のハッシュでETagを付与し、一致すれば304を返す"""
+    etag = body_etag(body)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    response = Response(content=body, media_type="application/json")
+    set_etag_headers(response, etag)
+    return response
@@ -0,0 +1,125 @@
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# 書き込み失敗時の扱い
+# - best-effort: 失敗したバッファは破棄する（ログイン時刻が一部欠けてもよい場合）
+# - retry: 失敗したバッファを戻し、次回の書き込みで再試行する
+DURABILITY_MODES = ("best-effort", "retry")
+
+class LastLoginRecorder:
+    """最終ログイン時刻のライトビハインドバッファ
+
+    ログイン・登録のリクエストでは users への UPDATE を発行せず、ユーザーごとに
+    最新のログイン時刻だけを保持する。バックグラウンドスレッドが interval 秒ごと、
+    または保持件数が max_pending に達した時点で、CASE 式の1文のUPDATEにまとめて反映する。
+    shutdown で残りを書き込むため、正常終了時にはログイン時刻は失われない。
+    スレッドは最初の記録時に起動する（gunicorn --preload のフォーク前に起動しないため）。
+    """
+
+    def __init__(self, interval: float, max_pending: int, durability: str):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown last login durability: {durability}")
+        self._interval = interval
+        self._max_pending = max_pending
+        self._durability = durability
+        self._pending: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def record(self, user_id: int) -> datetime:
+        """ログイン時刻を記録し、その時刻を返す"""
+        timestamp = datetime.now(timezone.utc)
+        with self._lock:
+            self._merge({user_id: timestamp})
+            full = len(self._pending) >= self._max_pending
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run, name="last-login-flush", daemon=True)
+                self._thread.start()
+        if self._stopped:
+            # 停止後（シャットダウン処理中）の記録は、呼び出し元のイベントループを止めないよう別スレッドで書き込む
+            threading.Thread(target=self._flush_logged, name="last-login-flush", daemon=True).start()
+        elif full:
+            self._wakeup.set()
+        return timestamp
+
+    def pending_count(self) -> int:
+        """書き込み待ちのユーザー数"""
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """溜まっているログイン時刻を書き込み、書き込んだ件数を返す"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        import crud
+        from database import SessionLocal
+        db = SessionLocal()
+        try:
+            crud.bulk_update_last_login(db, pending)
+        except Exception:
+            db.rollback()
+            if self._durability == "retry":
+                with self._lock:
+                    self._merge(pending)
+            raise
+        finally:
+            db.close()
+        return len(pending)
+
+    def shutdown(self, timeout: float = 10.0):
+        """書き込みスレッドを停止し、残りのログイン時刻を書き込む"""
+        self._stopped = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Failed to flush last login timestamps on shutdown")
+
+    def reset(self):
+        """フォーク後の子プロセスで親のバッファとスレッドを引き継がないよう初期化"""
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def _merge(self, entries: Dict[int, datetime]):
+        """ユーザーごとに新しい方の時刻を残して統合（ロック保持中に呼ぶ）"""
+        for user_id, timestamp in entries.items():
+            current = self._pending.get(user_id)
+            if current is None or current < timestamp:
+                self._pending[user_id] = timestamp
+
+    def _flush_logged(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Failed to flush last login timestamps")
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self._interval)
+            self._wakeup.clear()
+            self._flush_logged()
+
+last_login_recorder = LastLoginRecorder(
+    interval=settings.last_login_flush_interval,
+    max_pending=settings.last_login_flush_max_pending,
+    durability=settings.last_login_durability,
+)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=last_login_recorder.reset)
@@ -1,36 +1,106 @@
-from fastapi import FastAPI, HTTPException, Depends, Query, Request
+import os
+from anyio import to_thread
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
-import models, schemas, crud, database
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional, Dict, Any, Union
+from datetime import datetime, timezone
+from sqlalchemy import text
+import models, schemas, crud, database, etags, responses, task_export, task_import, metrics
 from database import SessionLocal, engine, get_db
 from auth import get_current_session, get_current_user
 from user_routes import router as user_router
+import security
 from security import (
-    limiter, 
-    add_security_headers, 
-    limit_upload_size,
-    custom_rate_limit_handler
+    api_rate_limit,
+    SecurityHeadersMiddleware,
+    RequestSizeLimitMiddleware,
+    custom_rate_limit_handler,
+    password_hasher_busy_handler
 )
-from slowapi import _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
 from config.settings import settings
+from passwords import PasswordHasherBusy
+from last_login import last_login_recorder
+from compression import CompressionMiddleware
+from metrics import MetricsMiddleware
+from diagnostics import DiagnosticsMiddleware, instrument_slow_queries
 
-models.Base.metadata.create_all(bind=engine)
+if settings.metrics_enabled:
+    metrics.instrument_engine(engine)
+if settings.diagnostics_enabled:
+    instrument_slow_queries(engine, settings.slow_query_threshold_ms)
 
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
-    debug=settings.debug
+    debug=settings.debug,
+    default_response_class=responses.FastJSONResponse
 )
 
+@app.on_event("startup")
+async def prepare_worker():
+    """ワーカー起動時の初期化
+
+    スレッドプールのサイズをDBプールに合わせ、server.py を経由せずに
+    起動した場合（uvicorn main:app 等）はここでテーブルを作成する。
+    LAZY_INIT 時はテーブル作成を初回のDB利用時まで遅らせ、起動を待たせずに
+    バックグラウンドで接続プールを温める。
+    """
+    to_thread.current_default_thread_limiter().total_tokens = database.threadpool_size()
+    if settings.lazy_init:
+        if settings.db_prewarm_connections > 0:
+            database.start_prewarm(settings.db_prewarm_connections)
+    elif settings.db_create_schema and not os.environ.get(database.SCHEMA_READY_ENV):
+        database.create_schema()
+
+@app.on_event("shutdown")
+def flush_last_logins():
+    """終了時に書き込み待ちの最終ログイン時刻を反映"""
+    last_login_recorder.shutdown()
+
 # レート制限の設定
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, custom_rate_limit_handler)
+# slowapi は旧来の @limiter.limit デコレーター用（現在のルートは RateLimit 依存関数で制限する）。
+# LAZY_INIT 時は起動時間短縮のため slowapi を読み込まない
+if not settings.lazy_init:
+    from slowapi.errors import RateLimitExceeded
+    app.state.limiter = security.limiter
+    app.add_exception_handler(RateLimitExceeded, custom_rate_limit_handler)
+app.add_exception_handler(PasswordHasherBusy, password_hasher_busy_handler)
 
 # セキュリティミドルウェア
-app.middleware("http")(add_security_headers)
-app.middleware("http")(limit_upload_size)
+# 後から追加したものほど外側になる。サイズ超過の413にもセキュリティヘッダーが付くよう、
+# サイズ制限をヘッダー追加の内側に置く
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    max_size=settings.max_request_size,
+    # インポートは専用の上限（IMPORT_MAX_REQUEST_SIZE）をストリーミング中に適用
+    exempt_paths=("/api/tasks/import",)
+)
+app.add_middleware(SecurityHeadersMiddleware)
+
+# レスポンス圧縮（gzip / brotli）
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+)
+
+# 計測（ルート別レイテンシ・Server-Timing）
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware, server_timing=settings.server_timing_enabled)
+
+# 診断（遅いSQLの呼び出し元ルート記録・サンプリングプロファイラ）
+if settings.diagnostics_enabled:
+    app.add_middleware(
+        DiagnosticsMiddleware,
+        sample_rate=settings.profile_sample_rate,
+        output_dir=settings.profile_output_dir,
+        interval=settings.profile_interval_ms / 1000,
+    )
 
 # CORS設定
 app.add_middleware(
@@ -42,6 +112,12 @@ app.add_middleware(
 )
 
 
+# 非同期DBエンジン使用時は、非同期版エンドポイントを同期版より先に登録して優先させる
+if settings.use_async_db:
+    from async_routes import router as async_router, auth_router as async_auth_router
+    app.include_router(async_router)
+    app.include_router(async_auth_router, prefix="/auth")
+
 # 認証ルーターを登録
 app.include_router(user_router, prefix="/auth")
 
@@ -55,28 +131,86 @@ def read_root():
 
 @app.get("/health")
 def health_check():
+    """ヘルスチェック（DB接続とコネクションプールの状態を含む）"""
+    database_status = "ok"
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception:
+        database_status = "unavailable"
+    
     return {
-        "status": "healthy",
+        "status": "healthy" if database_status == "ok" else "degraded",
         "environment": settings.environment,
         "version": settings.app_version,
-        "timestamp": "2025-07-06T12:00:00Z"
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "database": database_status,
+        "db_pool": database.get_pool_status()
+    }
+
+@app.get("/health/db-pool")
+def db_pool_status():
+    """DBコネクションプールの使用状況（プールサイズ調整用）"""
+    return database.get_pool_status()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus形式のメトリクス（ワーカープロセス単位）"""
+    pool_status = database.get_pool_status()
+    gauges = {
+        f"db_pool_{key}": (f"Database connection pool {key.replace('_', ' ')}", value)
+        for key, value in pool_status.items()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
     }
+    gauges["last_login_pending"] = ("Users with last login timestamps waiting to be written", last_login_recorder.pending_count())
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
 
 # Task endpoints
-@app.get("/api/tasks", response_model=List[schemas.Task])
+@app.get("/api/tasks", response_model=Union[schemas.TaskPage, List[schemas.Task]], dependencies=[Depends(api_rate_limit)])
 def get_tasks(
+    request: Request,
     search: Optional[str] = Query(None, description="検索キーワード"),
     category_id: Optional[int] = Query(None, description="カテゴリID"),
     priority: Optional[int] = Query(None, ge=1, le=3, description="優先度 (1=High, 2=Medium, 3=Low)"),
     is_completed: Optional[bool] = Query(None, description="完了状態"),
+    limit: Optional[int] = Query(None, ge=1, le=200, description="1ページの件数（指定時はページング形式で返す）"),
+    cursor: Optional[str] = Query(None, description="前ページの next_cursor"),
+    ranked: bool = Query(False, description="検索結果を関連度順に並べる（search指定時のみ）"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    """ユーザーのタスクを条件付きで取得"""
-    tasks = crud.get_tasks(db, user_id=current_user.id, search=search, category_id=category_id, priority=priority, is_completed=is_completed)
-    return tasks
+    """ユーザーのタスクを条件付きで取得
 
-@app.post("/api/tasks", response_model=schemas.Task)
+    limit 未指定の場合は従来どおり全件のリストを返す（旧クライアント互換）。
+    If-None-Match が一致する場合はタスクを読み込まずに304を返す。
+    """
+    etag = etags.version_etag(request, current_user.id, crud.get_data_version(db, current_user.id))
+    if etags.is_not_modified(request, etag):
+        return etags.not_modified_response(etag)
+    
+    filters = dict(search=search, category_id=category_id, priority=priority, is_completed=is_completed)
+    if limit is None and cursor is None:
+        tasks = crud.get_tasks(db, user_id=current_user.id, ranked=ranked, **filters)
+        result = responses.pydantic_json_response(schemas.TaskListAdapter, tasks)
+        etags.set_etag_headers(result, etag)
+        return result
+    
+    if ranked:
+        raise HTTPException(status_code=400, detail="ranked cannot be combined with pagination")
+    
+    try:
+        tasks, next_cursor = crud.get_task_page(
+            db, user_id=current_user.id, limit=limit or 50, cursor=cursor, **filters
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    result = responses.pydantic_json_response(
+        schemas.TaskPageAdapter, {"items": tasks, "next_cursor": next_cursor}
+    )
+    etags.set_etag_headers(result, etag)
+    return result
+
+@app.post("/api/tasks", response_model=schemas.Task, dependencies=[Depends(api_rate_limit)])
 def create_task(
     task: schemas.TaskCreate, 
     db: Session = Depends(get_db),
@@ -85,19 +219,100 @@ def create_task(
     """新規タスクを作成"""
     return crud.create_task(db=db, task=task, user_id=current_user.id)
 
-@app.get("/api/tasks/{task_id}", response_model=schemas.Task)
+@app.post("/api/tasks/batch", response_model=schemas.TaskBatchResponse, dependencies=[Depends(api_rate_limit)])
+def batch_tasks(
+    batch: schemas.TaskBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """タスクの作成・更新・削除を1トランザクションで一括処理"""
+    try:
+        results = crud.apply_task_batch(db, batch=batch, user_id=current_user.id)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Batch failed due to database constraint")
+    return schemas.TaskBatchResponse(results=results)
+
+@app.get("/api/tasks/stats", response_model=schemas.TaskStats, dependencies=[Depends(api_rate_limit)])
+def get_task_stats(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """タスクの集計（ダッシュボード用。タスク一覧を取得せずに件数を返す）
+
+    期限切れ件数は現在時刻で変わるため、data_version ではなく本文のハッシュをETagにする。
+    """
+    stats = schemas.TaskStats.model_validate(crud.get_task_stats(db, user_id=current_user.id))
+    return etags.json_response_with_etag(request, stats.model_dump_json().encode())
+
+@app.get("/api/tasks/export", dependencies=[Depends(api_rate_limit)])
+def export_tasks(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="出力形式 (ndjson / csv)"),
+    current_user: models.User = Depends(get_current_user)
+):
+    """全タスクをNDJSONまたはCSVでストリーミング出力"""
+    return StreamingResponse(
+        task_export.iter_task_export(current_user.id, format),
+        media_type=task_export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'}
+    )
+
+@app.post("/api/tasks/import", response_model=schemas.TaskImportResult, dependencies=[Depends(api_rate_limit)])
+async def import_tasks(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$", description="入力形式（省略時はContent-Typeで判定）"),
+    current_user: models.User = Depends(get_current_user)
+):
+    """NDJSONまたはCSVからタスクとカテゴリを一括インポート
+
+    本文は逐次読み込み、BATCH_SIZE 件ごとにまとめて追加する。
+    インポート全体が1トランザクションで、本文の上限超過（413）やクライアントの切断で
+    中断した場合は何も保存されない。不正な行はスキップして errors に行番号とともに返す。
+    """
+    import_format = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    importer = task_import.TaskImporter(current_user.id)
+    
+    try:
+        batch = []
+        async for line, record, error in task_import.iter_records(
+            request.stream(), import_format, settings.import_max_request_size
+        ):
+            if error:
+                importer.add_error(line, error)
+                continue
+            batch.append((line, record))
+            if len(batch) >= task_import.BATCH_SIZE:
+                await run_in_threadpool(importer.import_batch, batch)
+                batch = []
+        if batch:
+            await run_in_threadpool(importer.import_batch, batch)
+        await run_in_threadpool(importer.commit)
+    finally:
+        await run_in_threadpool(importer.close)
+    
+    return importer.result()
+
+@app.get("/api/tasks/{task_id}", response_model=schemas.Task, dependencies=[Depends(api_rate_limit)])
 def get_task(
     task_id: int, 
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """特定のタスクを取得"""
+    etag = etags.version_etag(request, current_user.id, crud.get_data_version(db, current_user.id))
+    if etags.is_not_modified(request, etag):
+        return etags.not_modified_response(etag)
+    etags.set_etag_headers(response, etag)
+    
     db_task = crud.get_task(db, task_id=task_id, user_id=current_user.id)
     if db_task is None:
         raise HTTPException(status_code=404, detail="Task not found")
     return db_task
 
-@app.put("/api/tasks/{task_id}", response_model=schemas.Task)
+@app.put("/api/tasks/{task_id}", response_model=schemas.Task, dependencies=[Depends(api_rate_limit)])
 def update_task(
     task_id: int, 
     task: schemas.TaskUpdate, 
@@ -110,7 +325,7 @@ def update_task(
         raise HTTPException(status_code=404, detail="Task not found")
     return db_task
 
-@app.delete("/api/tasks/{task_id}")
+@app.delete("/api/tasks/{task_id}", dependencies=[Depends(api_rate_limit)])
 def delete_task(
     task_id: int, 
     db: Session = Depends(get_db),
@@ -122,17 +337,47 @@ def delete_task(
         raise HTTPException(status_code=404, detail="Task not found")
     return {"message": "Task deleted successfully"}
 
+# Sync endpoints
+@app.get("/api/sync", response_model=schemas.SyncResponse, dependencies=[Depends(api_rate_limit)])
+def sync_changes(
+    since: Optional[str] = Query(None, description="前回の同期で返された next_token"),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    """前回の同期以降に変更されたタスク・カテゴリと削除されたIDを取得"""
+    try:
+        since_time = crud.decode_sync_token(since) if since else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    
+    changes = crud.get_changes(
+        db, user_id=current_user.id, since=since_time,
+        retention_days=settings.sync_tombstone_retention_days
+    )
+    return schemas.SyncResponse(
+        tasks=[schemas.Task.model_validate(task) for task in changes.pop("tasks")],
+        categories=[schemas.Category.model_validate(category) for category in changes.pop("categories")],
+        **changes
+    )
+
 # Category endpoints
-@app.get("/api/categories", response_model=List[schemas.Category])
+@app.get("/api/categories", response_model=List[schemas.Category], dependencies=[Depends(api_rate_limit)])
 def get_categories(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """ユーザーのカテゴリを取得"""
+    etag = etags.version_etag(request, current_user.id, crud.get_data_version(db, current_user.id))
+    if etags.is_not_modified(request, etag):
+        return etags.not_modified_response(etag)
+    etags.set_etag_headers(response, etag)
+    
     categories = crud.get_categories(db, user_id=current_user.id)
     return categories
 
-@app.post("/api/categories", response_model=schemas.Category)
+@app.post("/api/categories", response_model=schemas.Category, dependencies=[Depends(api_rate_limit)])
 def create_category(
     category: schemas.CategoryCreate, 
     db: Session = Depends(get_db),
@@ -141,7 +386,7 @@ def create_category(
     """新規カテゴリを作成"""
     return crud.create_category(db=db, category=category, user_id=current_user.id)
 
-@app.get("/api/categories/{category_id}", response_model=schemas.Category)
+@app.get("/api/categories/{category_id}", response_model=schemas.Category, dependencies=[Depends(api_rate_limit)])
 def get_category(
     category_id: int, 
     db: Session = Depends(get_db),
@@ -153,7 +398,7 @@ def get_category(
         raise HTTPException(status_code=404, detail="Category not found")
     return db_category
 
-@app.put("/api/categories/{category_id}", response_model=schemas.Category)
+@app.put("/api/categories/{category_id}", response_model=schemas.Category, dependencies=[Depends(api_rate_limit)])
 def update_category(
     category_id: int, 
     category: schemas.CategoryUpdate, 
@@ -166,7 +411,7 @@ def update_category(
         raise HTTPException(status_code=404, detail="Category not found")
     return db_category
 
-@app.delete("/api/categories/{category_id}")
+@app.delete("/api/categories/{category_id}", dependencies=[Depends(api_rate_limit)])
 def delete_category(
     category_id: int, 
     db: Session = Depends(get_db),
@@ -0,0 +1,150 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+from sqlalchemy import event
+
+# 軽量な計測レイヤー（Prometheusテキスト形式で出力）
+# 値はワーカープロセスごとに集計される
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+class Histogram:
+    """ラベル付きヒストグラム"""
+
+    def __init__(self, name: str, description: str, label_names: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [バケットごとの件数..., 合計値, 件数]
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in items:
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series[-1]}')
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.name}_sum{suffix} {series[-2]}")
+            lines.append(f"{self.name}_count{suffix} {series[-1]}")
+        return lines
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ("method", "route", "status")
+)
+db_statement_duration = Histogram(
+    "db_statement_duration_seconds", "Database statement execution time", (), DB_BUCKETS
+)
+operation_duration = Histogram(
+    "operation_duration_seconds", "Time spent in instrumented operations (password hashing, JWT verification)",
+    ("operation",)
+)
+
+# リクエストごとの内訳（Server-Timing 用）: 名前 -> [合計秒, 回数]
+_request_timings: ContextVar[Optional[dict]] = ContextVar("request_timings", default=None)
+
+def _add_request_timing(name: str, seconds: float):
+    timings = _request_timings.get()
+    if timings is not None:
+        entry = timings.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+@contextmanager
+def timed(operation: str):
+    """処理時間を operation_duration_seconds と Server-Timing に記録"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        operation_duration.observe(elapsed, operation)
+        _add_request_timing(operation, elapsed)
+
+def instrument_engine(engine):
+    """SQLAlchemyエンジンのSQL実行回数・時間を計測"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start_times = conn.info.get("query_start_times")
+        if not start_times:
+            return
+        elapsed = time.perf_counter() - start_times.pop()
+        db_statement_duration.observe(elapsed)
+        _add_request_timing("db", elapsed)
+
+def render(gauges: Optional[Dict[str, Tuple[str, float]]] = None) -> str:
+    """全メトリクスをPrometheusテキスト形式で出力（gauges: 名前 -> (説明, 値)）"""
+    lines = []
+    for histogram in (http_request_duration, db_statement_duration, operation_duration):
+        lines.extend(histogram.render())
+    for name, (description, value) in (gauges or {}).items():
+        lines.extend([f"# HELP {name} {description}", f"# TYPE {name} gauge", f"{name} {value}"])
+    return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """ルート別のレイテンシを記録し、Server-Timing ヘッダーを付与するASGIミドルウェア"""
+
+    def __init__(self, app, server_timing: bool = True):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        timings = {}
+        token = _request_timings.set(timings)
+        status_code = 500
+        
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    entries = [f"app;dur={(time.perf_counter() - start) * 1000:.1f}"]
+                    for name, (seconds, count) in timings.items():
+                        entries.append(f'{name};dur={seconds * 1000:.1f};desc="{count}"')
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"server-timing", ", ".join(entries).encode())]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe(time.perf_counter() - start, scope["method"], route_path, status_code)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -18,6 +18,7 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     last_login = Column(DateTime(timezone=True), nullable=True)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")  # タスク・カテゴリ変更のたびに加算（ETag用）
     
     # リレーションシップ
     tasks = relationship("Task", back_populates="user", cascade="all, delete-orphan")
@@ -31,9 +32,14 @@ class Category(Base):
     color = Column(String(7), nullable=True)  # Hex color code
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # ユーザーごとにカテゴリ名をユニークにする制約
-    __table_args__ = (UniqueConstraint('name', 'user_id', name='unique_category_per_user'),)
+    __table_args__ = (
+        UniqueConstraint('name', 'user_id', name='unique_category_per_user'),
+        # ユーザーのカテゴリ一覧（名前順）用
+        Index('ix_categories_user_id_name', 'user_id', 'name'),
+    )
     
     # リレーションシップ
     user = relationship("User", back_populates="categories")
@@ -53,6 +59,31 @@ class Task(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
+    __table_args__ = (
+        # タスク一覧（作成日時の降順・キーセットページング）用
+        Index('ix_tasks_user_id_created_at', 'user_id', created_at.desc(), id.desc()),
+        # 完了状態・優先度での絞り込み用
+        Index('ix_tasks_user_id_is_completed_priority', 'user_id', 'is_completed', 'priority'),
+        # カテゴリでの絞り込み・カテゴリ削除時の一括更新用
+        Index('ix_tasks_user_id_category_id', 'user_id', 'category_id'),
+        # 差分同期（updated_at 以降の変更取得）用
+        Index('ix_tasks_user_id_updated_at', 'user_id', 'updated_at'),
+    )
+    
     # リレーションシップ
     user = relationship("User", back_populates="tasks")
-    category = relationship("Category", back_populates="tasks")
\ No newline at end of file
+    category = relationship("Category", back_populates="tasks")
+
+class SyncTombstone(Base):
+    """削除されたタスク・カテゴリの記録（差分同期で削除を伝えるため）"""
+    __tablename__ = "sync_tombstones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    entity_type = Column(String(20), nullable=False)  # "task" または "category"
+    entity_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index('ix_sync_tombstones_user_id_deleted_at', 'user_id', 'deleted_at'),
+    )
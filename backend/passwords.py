@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+from config.settings import settings
+import metrics
+
+class LazyCryptContext:
+    """初回使用時に passlib の CryptContext を生成するプロキシ
+
+    passlib / bcrypt の import は重いため、起動時ではなく最初のハッシュ処理で行う。
+    """
+
+    def __init__(self, **options):
+        self._options = options
+        self._context = None
+        self._lock = threading.Lock()
+
+    def _get(self):
+        if self._context is None:
+            with self._lock:
+                if self._context is None:
+                    from passlib.context import CryptContext
+                    self._context = CryptContext(**self._options)
+        return self._context
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+# パスワードハッシュ化（bcryptのコストは設定値で変更可能。
+# 既存ハッシュのコストが異なる場合は needs_update で検出され、ログイン時に再ハッシュされる）
+pwd_context = LazyCryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.bcrypt_rounds)
+
+class PasswordHasherBusy(Exception):
+    """ハッシュ処理の待ち行列が満杯のときに送出"""
+
+class PasswordHasher:
+    """bcrypt処理専用の上限付きワーカープール
+
+    bcryptはGILを解放するためスレッドで並列に動作する。
+    実行中＋待機中の件数を workers + queue_size に制限し、溢れた要求は待たずに
+    PasswordHasherBusy で即座に拒否する（503）。
+    リクエストからは submit_async で呼び出し、ハッシュ処理の完了をイベントループ上で
+    待つため、ログイン集中時でもリクエスト用のスレッドプールを占有しない。
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def submit(self, fn, *args) -> Future:
+        """空きがあれば処理を投入して Future を返す（満杯なら PasswordHasherBusy）"""
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        """処理を投入して結果を待つ（リクエスト外の同期処理用）"""
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn, *args):
+        """処理を投入し、スレッドを占有せずに結果を待つ"""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    queue_size=settings.password_hash_queue_size,
+)
+
+def hash_password(password: str) -> str:
+    """パスワードをハッシュ化"""
+    with metrics.timed("password_hash"):
+        return hasher.run(pwd_context.hash, password)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """パスワードを検証"""
+    with metrics.timed("password_verify"):
+        return hasher.run(pwd_context.verify, plain_password, hashed_password)
+
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """パスワードを検証し、ハッシュが古い場合は新しいハッシュも返す"""
+    with metrics.timed("password_verify"):
+        return hasher.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def hash_password_async(password: str) -> str:
+    """パスワードをハッシュ化（async エンドポイント用）"""
+    with metrics.timed("password_hash"):
+        return await hasher.run_async(pwd_context.hash, password)
+
+async def verify_and_update_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """パスワードを検証し、ハッシュが古い場合は新しいハッシュも返す（async エンドポイント用）"""
+    with metrics.timed("password_verify"):
+        return await hasher.run_async(pwd_context.verify_and_update, plain_password, hashed_password)
@@ -0,0 +1,24 @@
+from typing import Any
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # orjson は任意依存（未インストール時は標準のJSONResponse）
+    orjson = None
+
+class FastJSONResponse(JSONResponse):
+    """orjson でシリアライズするJSONレスポンス（datetime等もネイティブに変換）"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+def pydantic_json_response(adapter, data: Any) -> Response:
+    """TypeAdapter で検証・JSON化したバイト列をそのまま返す
+
+    ORMオブジェクトから pydantic-core で直接JSONを生成し、
+    jsonable_encoder や dict への中間変換を経由しない。
+    """
+    body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+    return Response(content=body, media_type="application/json")
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, Field, EmailStr, TypeAdapter, AliasChoices
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Literal, Dict
 from enum import IntEnum
 
 class Priority(IntEnum):
@@ -108,4 +108,74 @@ class Task(TaskBase):
     category: Optional[Category] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TaskPage(BaseModel):
+    items: List[Task]
+    next_cursor: Optional[str] = None
+
+# ORMオブジェクトから直接JSONを生成するためのアダプター
+TaskListAdapter = TypeAdapter(List[Task])
+TaskPageAdapter = TypeAdapter(TaskPage)
+
+# タスク集計（GET /api/tasks/stats）
+class CategoryTaskCount(BaseModel):
+    category_id: Optional[int] = None  # None は未分類
+    total: int
+    completed: int
+
+class TaskStats(BaseModel):
+    total: int
+    completed: int
+    active: int
+    overdue: int
+    by_priority: Dict[int, int]
+    by_category: List[CategoryTaskCount]
+
+# 一括操作（POST /api/tasks/batch）
+class TaskBatchUpdate(TaskUpdate):
+    id: int
+
+class TaskBatchRequest(BaseModel):
+    create: List[TaskCreate] = Field(default_factory=list, max_length=1000)
+    update: List[TaskBatchUpdate] = Field(default_factory=list, max_length=1000)
+    delete: List[int] = Field(default_factory=list, max_length=1000)
+
+class TaskBatchResult(BaseModel):
+    op: Literal["create", "update", "delete"]
+    index: int  # リクエスト内の各リストでの位置
+    id: Optional[int] = None
+    status: Literal["ok", "not_found"]
+
+class TaskBatchResponse(BaseModel):
+    results: List[TaskBatchResult]
+
+# 差分同期（GET /api/sync）
+class SyncResponse(BaseModel):
+    tasks: List[Task]
+    categories: List[Category]
+    deleted_task_ids: List[int] = []
+    deleted_category_ids: List[int] = []
+    next_token: str
+    full: bool  # True の場合はクライアント側のデータを全て置き換える
+
+# インポート（POST /api/tasks/import）
+class TaskImportRow(BaseModel):
+    title: str = Field(..., min_length=1, max_length=255)
+    description: Optional[str] = None
+    is_completed: bool = False
+    priority: int = Field(default=2, ge=1, le=3)
+    due_date: Optional[datetime] = None
+    # エクスポート形式（category_name）と簡易形式（category）の両方を受け付ける
+    category_name: Optional[str] = Field(
+        default=None, max_length=100, validation_alias=AliasChoices("category_name", "category")
+    )
+
+class TaskImportError(BaseModel):
+    line: int
+    error: str
+
+class TaskImportResult(BaseModel):
+    imported: int
+    categories_created: int
+    errors: List[TaskImportError]
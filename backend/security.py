@@ -1,48 +1,220 @@
 from fastapi import Request, HTTPException, status
-from fastapi.responses import Response
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, JSONResponse
+from starlette.datastructures import Headers
+from limits import parse
+from limits.storage import MemoryStorage, storage_from_string
+from limits.strategies import STRATEGIES
+import logging
 import time
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import os
+from config.settings import settings
+from auth import verify_token
+
+logger = logging.getLogger(__name__)
 
 # レート制限の設定
-limiter = Limiter(key_func=get_remote_address)
+# カウンタの保存先は RATE_LIMIT_STORAGE_URI で切り替える（memory:// はワーカーごと、
+# redis:// 等を指定すると全ワーカーで共有）。moving-window はRedis上では
+# Luaスクリプトで原子的に処理されるため、ワーカー間のロックは不要。
+def get_remote_address(request: Request) -> str:
+    """クライアントのIPアドレス（slowapi.util.get_remote_address と同じ）"""
+    if not request.client or not request.client.host:
+        return "127.0.0.1"
+    return request.client.host
+
+def __getattr__(name: str):
+    """slowapi の limiter（@limiter.limit デコレーター用）を初回参照時に生成
+
+    現在のルートは RateLimit 依存関数を使うため、slowapi の import は必要になるまで行わない。
+    """
+    if name == "limiter":
+        from slowapi import Limiter
+        limiter = Limiter(
+            key_func=get_remote_address,
+            storage_uri=settings.rate_limit_storage_uri,
+            strategy=settings.rate_limit_strategy
+        )
+        globals()["limiter"] = limiter
+        return limiter
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+rate_limit_storage = storage_from_string(settings.rate_limit_storage_uri)
+rate_limit_strategy = STRATEGIES[settings.rate_limit_strategy](rate_limit_storage)
+
+def rate_limit_key(request: Request) -> str:
+    """レート制限のキー（有効なJWTがあればユーザーID、なければIPアドレス）"""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            user_id = verify_token(token).get("user_id")
+            if user_id is not None:
+                return f"user:{user_id}"
+        except HTTPException:
+            pass
+    return f"ip:{get_remote_address(request)}"
+
+class RateLimit:
+    """ルートに付与するレート制限の依存関数
+
+    例: dependencies=[Depends(RateLimit(settings.rate_limit_api, "api"))]
+    プロセス内のカウンタ（memory://）はI/Oを伴わないためイベントループ上で数え、
+    Redis等のストレージは通信で待つためスレッドプールで数える。
+    """
+
+    def __init__(self, limit: str, scope: str):
+        self.item = parse(limit)
+        self.scope = scope
+
+    async def __call__(self, request: Request):
+        if not settings.rate_limit_enabled:
+            return
+        key = rate_limit_key(request)
+        if isinstance(rate_limit_strategy.storage, MemoryStorage):
+            retry_after = self.hit(key)
+        else:
+            retry_after = await run_in_threadpool(self.hit, key)
+        if retry_after is None:
+            return
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={
+                "error": "Rate limit exceeded",
+                "message": f"Too many requests. Retry after {retry_after} seconds.",
+                "retry_after": retry_after
+            },
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    def hit(self, key: str) -> Optional[int]:
+        """リクエストを1回数え、上限を超えていれば再試行までの秒数を返す"""
+        try:
+            if rate_limit_strategy.hit(self.item, self.scope, key):
+                return None
+            reset_at, _ = rate_limit_strategy.get_window_stats(self.item, self.scope, key)
+        except Exception as e:
+            # ストレージ障害時はリクエストを通す（レート制限でサービスを止めない）
+            logger.warning(f"レート制限ストレージにアクセスできません: {e}")
+            return None
+        return max(1, int(reset_at - time.time()))
+
+# API全般と認証（登録・ログイン）のレート制限
+api_rate_limit = RateLimit(settings.rate_limit_api, "api")
+auth_rate_limit = RateLimit(settings.rate_limit_auth, "auth")
+
+# セキュリティヘッダー
+SECURITY_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"strict-transport-security", b"max-age=31536000; includeSubDomains"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"content-security-policy", b"default-src 'self'"),
+]
 
 # セキュリティヘッダーミドルウェア
-async def add_security_headers(request: Request, call_next):
-    """セキュリティヘッダーを追加するミドルウェア"""
-    response: Response = await call_next(request)
-    
-    # セキュリティヘッダーを追加
-    response.headers["X-Content-Type-Options"] = "nosniff"
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["X-XSS-Protection"] = "1; mode=block"
-    response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-    response.headers["Content-Security-Policy"] = "default-src 'self'"
-    
-    return response
+class SecurityHeadersMiddleware:
+    """セキュリティヘッダーを追加するASGIミドルウェア
+
+    BaseHTTPMiddleware を使わず、レスポンス開始メッセージにヘッダーを直接追加する。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                names = {name for name, _ in SECURITY_HEADERS}
+                headers = [(name, value) for name, value in message.get("headers", []) if name.lower() not in names]
+                message["headers"] = headers + SECURITY_HEADERS
+            await send(message)
+        
+        await self.app(scope, receive, send_with_headers)
+
+class RequestTooLarge(HTTPException):
+    """リクエスト本文がサイズ上限を超えた場合に送出
+
+    HTTPException のサブクラスなので、本文の読み込み中に送出されても
+    FastAPI の例外ハンドラーで413として返される。
+    """
+
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Request entity too large"
+        )
 
 # リクエストサイズ制限ミドルウェア
-async def limit_upload_size(request: Request, call_next):
-    """リクエストサイズを制限するミドルウェア"""
-    content_length = request.headers.get("content-length")
-    if content_length:
-        content_length = int(content_length)
-        max_size = 1024 * 1024  # 1MB
-        if content_length > max_size:
-            raise HTTPException(
-                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                detail="Request entity too large"
-            )
-    
-    response = await call_next(request)
-    return response
+class RequestSizeLimitMiddleware:
+    """リクエストサイズを制限するASGIミドルウェア
+
+    Content-Length が上限を超える場合は本文を読まずに413を返す。
+    Content-Length のないチャンク転送でも、受信した本文の累計で上限を判定する。
+    exempt_paths のパスは対象外（エンドポイント側で独自の上限を適用する）。
+    """
+
+    def __init__(self, app, max_size: int, exempt_paths: tuple = ()):
+        self.app = app
+        self.max_size = max_size
+        self.exempt_paths = frozenset(exempt_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+        
+        max_size = self.max_size
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None:
+            try:
+                too_large = int(content_length) > max_size
+            except ValueError:
+                too_large = False
+            if too_large:
+                await self._send_too_large(send)
+                return
+        
+        received = 0
+        response_started = False
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_size:
+                    raise RequestTooLarge()
+            return message
+        
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except RequestTooLarge:
+            if response_started:
+                raise
+            await self._send_too_large(send)
+
+    async def _send_too_large(self, send):
+        response = JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={"detail": "Request entity too large"}
+        )
+        await response({"type": "http"}, None, send)
 
 # レート制限のカスタムエラーハンドラー
-def custom_rate_limit_handler(request: Request, exc: RateLimitExceeded):
+def custom_rate_limit_handler(request: Request, exc: Exception):
     """カスタムレート制限エラーハンドラー"""
     response = HTTPException(
         status_code=status.HTTP_429_TOO_MANY_REQUESTS,
@@ -54,6 +226,15 @@ def custom_rate_limit_handler(request: Request, exc: RateLimitExceeded):
     )
     return response
 
+# パスワードハッシュの待ち行列が満杯の場合のエラーハンドラー
+def password_hasher_busy_handler(request: Request, exc: Exception):
+    """ログイン集中時に503を返して再試行を促す"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Authentication service is busy. Please retry shortly."},
+        headers={"Retry-After": "1"}
+    )
+
 # 入力値検証関数
 def validate_string_input(value: str, max_length: int = 255, field_name: str = "field") -> str:
     """文字列入力値を検証"""
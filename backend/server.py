@@ -0,0 +1,95 @@
+import argparse
+import logging
+import os
+from gunicorn.app.base import BaseApplication
+from uvicorn.workers import UvicornWorker
+from config.settings import settings
+import database
+
+# サーバー起動（python server.py）
+# 本番は gunicorn + Uvicorn ワーカー、--reload 指定時は開発用に uvicorn 単体で起動する。
+# テーブル作成はワーカーのフォーク前に1回だけ行い、各ワーカーの import 時には行わない。
+
+logger = logging.getLogger(__name__)
+
+class TunedUvicornWorker(UvicornWorker):
+    """イベントループ（uvloop）とHTTPパーサ（httptools）を設定値で選択するワーカー"""
+    CONFIG_KWARGS = {"loop": settings.server_loop, "http": settings.server_http}
+
+class GunicornApplication(BaseApplication):
+    """設定値から構成する gunicorn アプリケーション"""
+
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from main import app
+        return app
+
+def cpu_count() -> int:
+    """このプロセスが使えるCPU数（コンテナのCPU割り当てを考慮）"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def worker_count() -> int:
+    """ワーカープロセス数
+
+    WEB_CONCURRENCY が指定されていればそれを使い、なければ 2 × CPU + 1 を
+    WEB_CONCURRENCY_MAX で頭打ちにする。DB_MAX_CONNECTIONS が指定されている場合は
+    ワーカー数 × 1ワーカーのプール上限がそれを超えないよう減らす。
+    """
+    workers = settings.web_concurrency or min(cpu_count() * 2 + 1, settings.web_concurrency_max)
+    if settings.db_max_connections > 0:
+        workers = min(workers, settings.db_max_connections // database.connections_per_worker())
+    return max(workers, 1)
+
+def gunicorn_options(workers: int) -> dict:
+    """gunicorn の設定"""
+    return {
+        "bind": f"{settings.host}:{settings.port}",
+        "workers": workers,
+        "worker_class": "server.TunedUvicornWorker",
+        # アプリをマスターで読み込んでからフォーク（メモリ共有・起動時間短縮）
+        "preload_app": True,
+        "timeout": settings.server_timeout,
+        "keepalive": settings.server_keepalive,
+        "max_requests": settings.server_max_requests,
+        "max_requests_jitter": settings.server_max_requests_jitter,
+        "accesslog": "-",
+        "errorlog": "-",
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="TODO App API server")
+    parser.add_argument("--reload", action="store_true", help="開発用: uvicorn 単体でコード変更時に再起動")
+    args = parser.parse_args()
+
+    # LAZY_INIT 時は起動を待たせないよう、テーブル作成は各ワーカーの初回DB利用時に行う
+    if settings.db_create_schema and not settings.lazy_init:
+        logger.info("Creating database tables before starting workers...")
+        database.create_schema()
+
+    if args.reload:
+        import uvicorn
+        uvicorn.run(
+            "main:app", host=settings.host, port=settings.port, reload=True,
+            loop=settings.server_loop, http=settings.server_http
+        )
+        return
+
+    workers = worker_count()
+    logger.info(
+        "Starting gunicorn: workers=%d threadpool=%d db_connections_per_worker=%d loop=%s http=%s",
+        workers, database.threadpool_size(), database.connections_per_worker(),
+        settings.server_loop, settings.server_http
+    )
+    GunicornApplication(gunicorn_options(workers)).run()
+
+if __name__ == "__main__":
+    main()
@@ -10,11 +10,13 @@ echo "Running database migrations..."
 alembic upgrade head
 
 # Start the application
+# server.py creates missing tables once before forking, then starts the workers
+# (worker count, event loop and threadpool are configured via settings, see .env.example)
 echo "Starting FastAPI server..."
 if [ "$ENVIRONMENT" = "production" ]; then
     echo "Starting with Gunicorn for production..."
-    exec gunicorn main:app -w 2 -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:${PORT:-8000} --preload --max-requests 1000 --max-requests-jitter 50
+    exec python server.py
 else
     echo "Starting with Uvicorn for development..."
-    exec uvicorn main:app --host 0.0.0.0 --port ${PORT:-8000} --reload
-fi
\ No newline at end of file
+    exec python server.py --reload
+fi
@@ -0,0 +1,65 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator
+import crud
+from database import SessionLocal
+
+try:
+    import orjson
+except ImportError:  # orjson は任意依存
+    orjson = None
+
+# エクスポートする列（CSVのヘッダー順）
+EXPORT_COLUMNS = [
+    "id", "title", "description", "is_completed", "priority", "due_date",
+    "category_id", "category_name", "created_at", "updated_at",
+]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+def _dumps(record: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record)
+    return json.dumps(record, ensure_ascii=False, default=str).encode()
+
+def _format_ndjson(rows) -> bytes:
+    lines = []
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, row))
+        for key in ("due_date", "created_at", "updated_at"):
+            if isinstance(record[key], datetime):
+                record[key] = record[key].isoformat()
+        lines.append(_dumps(record))
+    return b"\n".join(lines) + b"\n"
+
+def _format_csv(rows, header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+    return buffer.getvalue().encode("utf-8")
+
+def iter_task_export(user_id: int, export_format: str) -> Iterator[bytes]:
+    """ユーザーの全タスクを指定形式で逐次生成
+
+    リクエストのセッションとは別に専用のセッションを開き、サーバーサイドカーソルから
+    バッチ単位で読み出す。タスク数に関わらずメモリ使用量は一定。
+    """
+    with SessionLocal() as db:
+        header = True
+        if export_format == "csv":
+            # 0件でもヘッダーは出力する
+            yield _format_csv([], header=True)
+            header = False
+        for rows in crud.iter_task_export_rows(db, user_id=user_id):
+            if export_format == "csv":
+                yield _format_csv(rows, header=header)
+            else:
+                yield _format_ndjson(rows)
@@ -0,0 +1,159 @@
+import csv
+import json
+from typing import AsyncIterator, List, Optional, Tuple
+from pydantic import ValidationError
+import crud, schemas
+from database import SessionLocal
+from security import RequestTooLarge
+
+# 1回のINSERT（executemany）で追加するタスク数
+BATCH_SIZE = 1000
+# レスポンスに含めるエラーの上限
+MAX_REPORTED_ERRORS = 100
+
+async def iter_lines(stream: AsyncIterator[bytes], max_size: int) -> AsyncIterator[bytes]:
+    """リクエスト本文を行単位で逐次返す（本文全体はバッファしない）"""
+    received = 0
+    pending = bytearray()
+    async for chunk in stream:
+        received += len(chunk)
+        if received > max_size:
+            raise RequestTooLarge()
+        # 改行は新しく届いた部分だけから探す（長い行でも全体を走査し直さない）
+        searched = len(pending)
+        pending += chunk
+        start = 0
+        position = pending.find(b"\n", searched)
+        while position != -1:
+            yield bytes(pending[start:position])
+            start = position + 1
+            position = pending.find(b"\n", start)
+        del pending[:start]
+    if pending:
+        yield bytes(pending)
+
+async def iter_records(stream: AsyncIterator[bytes], import_format: str, max_size: int) -> AsyncIterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """本文を (行番号, レコード, エラー) に逐次変換
+
+    CSVは1行目をヘッダーとし、引用符内の改行を含むレコードにも対応する。
+    """
+    header = None
+    record_parts: List[str] = []
+    record_quotes = 0
+    record_line = 0
+    line_number = 0
+    async for raw_line in iter_lines(stream, max_size):
+        line_number += 1
+        line = raw_line.decode("utf-8-sig" if line_number == 1 else "utf-8", errors="replace").rstrip("\r")
+        
+        if import_format == "ndjson":
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, "Each line must be a JSON object"
+                continue
+            yield line_number, record, None
+            continue
+        
+        # CSV: 引用符の数が奇数の間は、引用符内の改行としてレコードを継続
+        if not record_parts:
+            record_line = line_number
+        record_parts.append(line)
+        record_quotes += line.count('"')
+        if record_quotes % 2 == 1:
+            continue
+        text = "\n".join(record_parts)
+        record_parts = []
+        record_quotes = 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        # 空欄は未指定として扱う
+        record = {key: value for key, value in zip(header, values) if value != ""}
+        yield record_line, record, None
+    
+    if record_parts:
+        yield record_line, None, "Unterminated quoted field"
+
+class TaskImporter:
+    """インポートしたレコードをバッチ単位で検証・保存する
+
+    インポート全体を1トランザクションで行い、最後まで読み込めた場合のみ commit() で確定する。
+    本文の上限超過やクライアントの切断で中断した場合は close() でロールバックし、1件も保存しない。
+    カテゴリ名は各バッチで1回のUPSERTで解決し、解決済みのIDは次のバッチでも再利用する。
+    タスクはバッチごとに executemany でまとめて追加し、コミット直前に updated_at を付け直す。
+    """
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.db = SessionLocal()
+        self.last_task_id = 0
+        self.category_ids = {}
+        self.imported = 0
+        self.categories_created = 0
+        self.errors: List[dict] = []
+
+    def add_error(self, line: int, error: str):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+    def import_batch(self, records: List[Tuple[int, dict]]):
+        """レコードを検証し、インポートのトランザクション内で追加（コミットはしない）"""
+        rows = []
+        for line, record in records:
+            try:
+                rows.append(schemas.TaskImportRow.model_validate(record))
+            except ValidationError as e:
+                self.add_error(line, "; ".join(
+                    f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in e.errors()
+                ))
+        if not rows:
+            return
+        if not self.imported:
+            # このIDより後に追加されたタスクを、コミット時にインポート分として扱う
+            self.last_task_id = crud.last_task_id(self.db)
+        
+        new_names = {row.category_name for row in rows if row.category_name} - self.category_ids.keys()
+        if new_names:
+            resolved, created = crud.upsert_categories(self.db, user_id=self.user_id, names=new_names)
+            self.category_ids.update(resolved)
+            self.categories_created += created
+        
+        crud.bulk_insert_tasks(self.db, user_id=self.user_id, rows=[
+            {
+                "title": row.title,
+                "description": row.description,
+                "is_completed": row.is_completed,
+                "priority": row.priority,
+                "due_date": row.due_date,
+                "category_id": self.category_ids.get(row.category_name),
+            }
+            for row in rows
+        ])
+        self.imported += len(rows)
+
+    def commit(self):
+        """追加したタスクとカテゴリを確定"""
+        if self.imported:
+            crud.touch_imported(self.db, self.user_id, self.last_task_id, self.category_ids.values())
+            crud.bump_data_version(self.db, self.user_id)
+        self.db.commit()
+
+    def close(self):
+        """セッションを閉じる（未確定の変更はロールバックされる）"""
+        self.db.close()
+
+    def result(self) -> dict:
+        return {
+            "imported": self.imported,
+            "categories_created": self.categories_created,
+            "errors": self.errors,
+        }
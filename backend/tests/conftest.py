@@ -0,0 +1,75 @@
+import os
+import sys
+import tempfile
+
+# アプリの import 前にテスト用の設定を環境変数で与える（SQLite の一時ファイルを使用）
+_db_dir = tempfile.mkdtemp(prefix="todo-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["ENVIRONMENT"] = "test"
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key")
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["RATE_LIMIT_API"] = "10000/minute"
+os.environ["RATE_LIMIT_AUTH"] = "10000/minute"
+os.environ["CACHE_BACKEND"] = "local"
+os.environ["USE_ASYNC_DB"] = "false"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+import database
+import models
+import main
+import security
+from auth import token_cache
+from cache import user_cache
+
+def reset():
+    """テーブル・キャッシュ・レート制限のカウンタを初期化"""
+    models.Base.metadata.drop_all(bind=database.engine)
+    models.Base.metadata.create_all(bind=database.engine)
+    user_cache.backend.clear()
+    token_cache.clear()
+    security.rate_limit_storage.reset()
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    """テストごとに初期化（テスト内で初期化し直す場合は reset_state() を呼ぶ）"""
+    reset()
+    yield reset
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def make_user(client):
+    """ユーザーを登録し、認証ヘッダーを返す関数"""
+    def make(username: str = "alice"):
+        response = client.post("/auth/register", json={
+            "email": f"{username}@example.com",
+            "username": username,
+            "password": "Passw0rd!x",
+            "full_name": username.title(),
+        })
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return make
+
+@pytest.fixture
+def auth_headers(make_user):
+    return make_user()
+
+@pytest.fixture
+def statements():
+    """同期エンジンで実行されたSQL文を記録するリスト（計測前に clear() する）"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(database.engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(database.engine, "before_cursor_execute", record)
@@ -0,0 +1,103 @@
+import pytest
+
+# 非同期エンジン（sqlite+aiosqlite）のドライバがない環境では実行しない
+pytest.importorskip("aiosqlite")
+
+from fastapi import FastAPI
+from sqlalchemy import event
+import async_database
+import crud
+import main
+from async_routes import router as async_router, auth_router as async_auth_router
+
+# レスポンスのうち、実行時刻や発行トークンで変わる項目
+VOLATILE_KEYS = {"created_at", "updated_at", "last_login", "access_token"}
+
+@pytest.fixture
+def use_async_routes(monkeypatch):
+    """非同期版ルートの有効・無効を切り替える関数
+
+    有効時は USE_ASYNC_DB=true と同じく非同期版ルートを同期版より先に登録する。
+    """
+    sync_routes = list(main.app.router.routes)
+    routes = FastAPI()
+    routes.include_router(async_router)
+    routes.include_router(async_auth_router, prefix="/auth")
+    monkeypatch.setattr(main.app.router, "routes", sync_routes)
+
+    def use(enabled: bool):
+        main.app.router.routes = (routes.router.routes if enabled else []) + sync_routes
+    return use
+
+@pytest.fixture
+def async_statements():
+    """非同期エンジンで実行されたSQL文"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(async_database.async_engine.sync_engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(async_database.async_engine.sync_engine, "before_cursor_execute", record)
+
+def normalize(value):
+    if isinstance(value, dict):
+        value = {key: normalize(item) for key, item in value.items() if key not in VOLATILE_KEYS}
+        if value.get("next_cursor"):
+            # カーソルは作成時刻を含むため、指しているタスクのIDで比較する
+            value["next_cursor"] = crud.decode_task_cursor(value["next_cursor"])[1]
+        return value
+    if isinstance(value, list):
+        return [normalize(item) for item in value]
+    return value
+
+def scenario(client, make_user):
+    """タスク・カテゴリのCRUDと一覧を一通り実行し、(ステータス, 本文) の列を返す"""
+    alice = make_user("alice")
+    bob = make_user("bob")
+    results = []
+
+    def call(method, path, headers=alice, **kwargs):
+        response = client.request(method, path, headers=headers, **kwargs)
+        results.append((method, path, response.status_code, normalize(response.json())))
+        return response.json()
+
+    work = call("POST", "/api/categories", json={"name": "Work", "color": "#ff0000"})
+    call("POST", "/api/categories", json={"name": "Home"})
+    call("POST", "/api/categories", json={"name": "Errands"})
+    for index in range(5):
+        call("POST", "/api/tasks", json={
+            "title": f"Task {index}", "priority": index % 3 + 1,
+            "category_id": work["id"] if index % 2 else None,
+        })
+    call("PUT", "/api/tasks/2", json={"is_completed": True, "description": "done"})
+    call("PUT", "/api/tasks/3", json={"category_id": None})
+    call("PUT", f"/api/categories/{work['id']}", json={"name": "Office"})
+    call("GET", "/api/tasks")
+    call("GET", "/api/tasks", params={"is_completed": False, "priority": 2})
+    call("GET", "/api/tasks", params={"category_id": work["id"]})
+    call("GET", "/api/tasks", params={"search": "task 4"})
+    first = call("GET", "/api/tasks", params={"limit": 2})
+    call("GET", "/api/tasks", params={"limit": 2, "cursor": first["next_cursor"]})
+    call("GET", "/api/tasks/1")
+    call("GET", "/api/tasks/1", headers=bob)
+    call("PUT", "/api/tasks/1", headers=bob, json={"title": "Stolen"})
+    call("DELETE", "/api/tasks/5")
+    call("DELETE", "/api/tasks/5")
+    call("DELETE", f"/api/categories/{work['id']}")
+    call("GET", "/api/tasks")
+    call("GET", "/api/categories")
+    call("GET", "/auth/me")
+    return results
+
+def test_async_routes_match_sync_routes(client, make_user, reset_state, use_async_routes, async_statements):
+    sync_results = scenario(client, make_user)
+    assert not async_statements
+
+    reset_state()
+    use_async_routes(True)
+    async_results = scenario(client, make_user)
+
+    assert async_statements, "async routes did not use the async engine"
+    assert async_results == sync_results
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+import pytest
+import passwords
+from passwords import PasswordHasher, PasswordHasherBusy
+
+def test_register_login_and_profile(client, auth_headers):
+    response = client.post("/auth/login", json={"email": "alice@example.com", "password": "Passw0rd!x"})
+    assert response.status_code == 200
+    assert response.json()["user"]["last_login"] is not None
+
+    profile = client.get("/auth/me", headers=auth_headers)
+    assert profile.status_code == 200
+    assert profile.json()["username"] == "alice"
+
+def test_login_with_wrong_password_returns_401(client, auth_headers):
+    response = client.post("/auth/login", json={"email": "alice@example.com", "password": "wrong-password"})
+
+    assert response.status_code == 401
+
+def test_login_with_unknown_email_returns_401(client):
+    response = client.post("/auth/login", json={"email": "nobody@example.com", "password": "Passw0rd!x"})
+
+    assert response.status_code == 401
+
+@pytest.mark.parametrize("field, message", [
+    ("email", "Email already registered"),
+    ("username", "Username already taken"),
+])
+def test_duplicate_registration_reports_field(client, auth_headers, field, message):
+    payload = {"email": "other@example.com", "username": "other", "password": "Passw0rd!x"}
+    payload[field] = {"email": "alice@example.com", "username": "alice"}[field]
+
+    response = client.post("/auth/register", json=payload)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == message
+
+def test_profile_update_duplicate_reports_field(client, make_user):
+    make_user("bob")
+    alice = make_user("alice")
+
+    response = client.put("/auth/me", json={"username": "bob"}, headers=alice)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Username already taken"
+
+def test_password_change(client, auth_headers):
+    response = client.put("/auth/me", json={"password": "N3wPassword!"}, headers=auth_headers)
+    assert response.status_code == 200
+
+    old = client.post("/auth/login", json={"email": "alice@example.com", "password": "Passw0rd!x"})
+    new = client.post("/auth/login", json={"email": "alice@example.com", "password": "N3wPassword!"})
+    assert old.status_code == 401
+    assert new.status_code == 200
+
+def test_hasher_rejects_without_waiting_when_full():
+    hasher = PasswordHasher(workers=1, queue_size=0)
+    release = threading.Event()
+    try:
+        hasher.submit(release.wait)
+        started = time.monotonic()
+        with pytest.raises(PasswordHasherBusy):
+            hasher.submit(release.wait)
+        assert time.monotonic() - started < 0.1
+    finally:
+        release.set()
+        hasher.shutdown()
+
+def test_hasher_waits_on_event_loop():
+    # ハッシュ処理の完了待ちの間もイベントループは他の処理を進められる
+    hasher = PasswordHasher(workers=1, queue_size=4)
+    release = threading.Event()
+
+    async def scenario():
+        pending = [asyncio.ensure_future(hasher.run_async(release.wait)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert not any(task.done() for task in pending)
+        release.set()
+        return await asyncio.gather(*pending)
+
+    try:
+        assert asyncio.run(scenario()) == [True, True, True]
+    finally:
+        hasher.shutdown()
+
+def test_login_returns_503_when_hasher_is_full(client, auth_headers, monkeypatch):
+    busy = PasswordHasher(workers=1, queue_size=0)
+    release = threading.Event()
+    busy.submit(release.wait)
+    monkeypatch.setattr(passwords, "hasher", busy)
+    try:
+        response = client.post("/auth/login", json={"email": "alice@example.com", "password": "Passw0rd!x"})
+    finally:
+        release.set()
+        busy.shutdown()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,103 @@
+import sys
+import time
+import types
+import pytest
+import models
+from cache import LocalTTLCache, RedisCache, UserCache
+
+class FakeRedis:
+    """テスト用のRedis互換サーバーの代用（GET/SET EX・PX/DEL/SCANのみ）"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key, value, ex=None, px=None):
+        ttl = ex if ex is not None else px / 1000
+        self.data[key] = (time.monotonic() + ttl, value)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def scan_iter(self, pattern):
+        prefix = pattern.rstrip("*")
+        return [key for key in list(self.data) if key.startswith(prefix)]
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """RedisCache が接続する1台のサーバー（同じURLのクライアントは同じデータを共有）"""
+    server = FakeRedis()
+    redis = types.SimpleNamespace(Redis=types.SimpleNamespace(from_url=lambda url: server))
+    monkeypatch.setitem(sys.modules, "redis", redis)
+    return server
+
+@pytest.fixture
+def redis_cache(redis_server):
+    return RedisCache("redis://localhost:6379/0", ttl=60, prefix="test:")
+
+@pytest.fixture(params=["local", "redis"])
+def backend(request):
+    if request.param == "local":
+        return LocalTTLCache(maxsize=100, ttl=60)
+    return request.getfixturevalue("redis_cache")
+
+def test_set_get_delete(backend):
+    backend.set(1, {"name": "alice"})
+
+    assert backend.get(1) == {"name": "alice"}
+    backend.delete(1)
+    assert backend.get(1) is None
+
+def test_per_entry_ttl_overrides_default(backend):
+    backend.set("short", "value", ttl=0.05)
+    backend.set("default", "value")
+
+    time.sleep(0.1)
+
+    assert backend.get("short") is None
+    assert backend.get("default") == "value"
+
+def test_clear(backend):
+    backend.set(1, "a")
+    backend.set(2, "b")
+
+    backend.clear()
+
+    assert backend.get(1) is None and backend.get(2) is None
+
+def test_redis_clear_keeps_other_prefixes(redis_cache):
+    other = RedisCache("redis://localhost:6379/0", ttl=60, prefix="other:")
+    other.set(1, "kept")
+    redis_cache.set(1, "removed")
+
+    redis_cache.clear()
+
+    assert other.get(1) == "kept"
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalTTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+def test_user_cache_omits_password_hash(backend):
+    user_cache = UserCache(backend)
+    user = models.User(id=7, email="alice@example.com", username="alice", hashed_password="secret", is_active=True)
+
+    user_cache.set(user)
+    cached = user_cache.get(7)
+
+    assert cached.username == "alice"
+    assert cached.hashed_password is None
+    user_cache.invalidate(7)
+    assert user_cache.get(7) is None
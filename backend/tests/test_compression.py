@@ -0,0 +1,66 @@
+import json
+import pytest
+import compression
+from compression import negotiate_encoding
+
+def create_tasks(client, headers, count):
+    for index in range(count):
+        client.post("/api/tasks", json={"title": f"Task {index}", "description": "x" * 50}, headers=headers)
+
+@pytest.mark.parametrize("accept_encoding, expected", [
+    ("gzip", "gzip"),
+    ("gzip;q=0", None),
+    ("identity", None),
+    ("*", "br" if compression.brotli is not None else "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("", None),
+])
+def test_negotiate_encoding(accept_encoding, expected):
+    assert negotiate_encoding(accept_encoding) == expected
+
+def test_large_json_is_gzipped(client, auth_headers):
+    create_tasks(client, auth_headers, 30)
+
+    response = client.get("/api/tasks", headers=dict(auth_headers, **{"Accept-Encoding": "gzip"}))
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert len(response.json()) == 30
+
+def test_small_or_unaccepted_responses_are_not_compressed(client, auth_headers):
+    create_tasks(client, auth_headers, 30)
+
+    small = client.get("/api/tasks/1", headers=dict(auth_headers, **{"Accept-Encoding": "gzip"}))
+    identity = client.get("/api/tasks", headers=dict(auth_headers, **{"Accept-Encoding": "identity"}))
+
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in identity.headers
+
+def test_compressed_etag_is_weak_and_revalidates(client, auth_headers):
+    create_tasks(client, auth_headers, 30)
+    headers = dict(auth_headers, **{"Accept-Encoding": "gzip"})
+    etag = client.get("/api/tasks", headers=headers).headers["etag"]
+
+    assert etag.startswith("W/")
+    assert client.get("/api/tasks", headers=dict(headers, **{"If-None-Match": etag})).status_code == 304
+
+def test_streaming_export_is_compressed_incrementally(client, auth_headers):
+    create_tasks(client, auth_headers, 30)
+
+    response = client.get("/api/tasks/export", headers=dict(auth_headers, **{"Accept-Encoding": "gzip"}))
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert len([json.loads(line) for line in response.text.splitlines()]) == 30
+
+def test_task_list_json_matches_schema(client, auth_headers):
+    # pydantic-core で直接生成したJSONが、従来のレスポンスと同じ形であること
+    category = client.post("/api/categories", json={"name": "Work"}, headers=auth_headers).json()
+    client.post("/api/tasks", json={"title": "A", "category_id": category["id"], "due_date": "2030-01-02T03:04:05"}, headers=auth_headers)
+
+    task = client.get("/api/tasks", headers=auth_headers).json()[0]
+
+    assert task["category"]["name"] == "Work"
+    assert task["due_date"] == "2030-01-02T03:04:05"
+    assert set(task) >= {"id", "title", "description", "is_completed", "priority", "category_id", "created_at", "updated_at"}
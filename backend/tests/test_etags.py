@@ -0,0 +1,28 @@
+import etags
+
+def test_unchanged_list_returns_304(client, auth_headers):
+    client.post("/api/tasks", json={"title": "A"}, headers=auth_headers)
+    etag = client.get("/api/tasks", headers=auth_headers).headers["ETag"]
+
+    response = client.get("/api/tasks", headers=dict(auth_headers, **{"If-None-Match": etag}))
+
+    assert response.status_code == 304
+
+def test_write_changes_etag(client, auth_headers):
+    etag = client.get("/api/tasks", headers=auth_headers).headers["ETag"]
+    client.post("/api/tasks", json={"title": "A"}, headers=auth_headers)
+
+    response = client.get("/api/tasks", headers=dict(auth_headers, **{"If-None-Match": etag}))
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_etag_changes_with_app_version(client, auth_headers, monkeypatch):
+    # デプロイでレスポンスの形式が変わった場合、データが同じでも古いETagでは304にならない
+    etag = client.get("/api/tasks", headers=auth_headers).headers["ETag"]
+    monkeypatch.setattr(etags.settings, "app_version", "999.0.0")
+
+    response = client.get("/api/tasks", headers=dict(auth_headers, **{"If-None-Match": etag}))
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
@@ -0,0 +1,117 @@
+import threading
+import time
+import pytest
+import crud
+import database
+import models
+from last_login import LastLoginRecorder
+
+@pytest.fixture
+def make_recorder():
+    """テスト終了時に停止する LastLoginRecorder を作る関数（定期書き込みは起きない間隔にする）"""
+    recorders = []
+
+    def make(max_pending: int = 1000, durability: str = "retry"):
+        recorder = LastLoginRecorder(interval=60, max_pending=max_pending, durability=durability)
+        recorders.append(recorder)
+        return recorder
+    yield make
+    for recorder in recorders:
+        recorder.shutdown()
+
+@pytest.fixture
+def writes(monkeypatch):
+    """bulk_update_last_login に渡された {ユーザーID: 時刻} と、書き込んだスレッドの記録"""
+    written = []
+
+    def record(db, last_logins):
+        written.append((dict(last_logins), threading.current_thread()))
+
+    monkeypatch.setattr(crud, "bulk_update_last_login", record)
+    return written
+
+def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def last_login_of(user_id: int):
+    with database.SessionLocal() as db:
+        return db.get(models.User, user_id).last_login
+
+def test_records_are_coalesced_to_the_newest_timestamp(make_recorder, writes):
+    recorder = make_recorder()
+    recorder.record(1)
+    newest = recorder.record(1)
+    recorder.record(2)
+
+    assert recorder.pending_count() == 2
+    assert recorder.flush() == 2
+    assert writes[0][0][1] == newest
+    assert recorder.pending_count() == 0
+
+def test_reaching_max_pending_triggers_a_flush(make_recorder, writes):
+    recorder = make_recorder(max_pending=3)
+    recorder.record(1)
+    recorder.record(2)
+    time.sleep(0.1)
+    assert writes == []
+
+    recorder.record(3)
+
+    wait_for(lambda: writes)
+    assert set(writes[0][0]) == {1, 2, 3}
+
+@pytest.mark.parametrize("durability, kept", [("retry", 1), ("best-effort", 0)])
+def test_failed_flush_requeues_only_in_retry_mode(make_recorder, monkeypatch, durability, kept):
+    def fail(db, last_logins):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(crud, "bulk_update_last_login", fail)
+    recorder = make_recorder(durability=durability)
+    recorder.record(1)
+
+    with pytest.raises(RuntimeError):
+        recorder.flush()
+
+    assert recorder.pending_count() == kept
+
+def test_retry_keeps_a_newer_timestamp_recorded_during_the_failed_flush(make_recorder, monkeypatch):
+    recorder = make_recorder()
+    recorder.record(1)
+    newer = []
+
+    def fail(db, last_logins):
+        # 書き込み中に同じユーザーが再度ログインした
+        newer.append(recorder.record(1))
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(crud, "bulk_update_last_login", fail)
+    with pytest.raises(RuntimeError):
+        recorder.flush()
+    written = []
+    monkeypatch.setattr(crud, "bulk_update_last_login", lambda db, last_logins: written.append(dict(last_logins)))
+    recorder.flush()
+
+    assert written == [{1: newer[0]}]
+
+def test_shutdown_writes_pending_timestamps(client, auth_headers, make_recorder):
+    user_id = client.get("/auth/me", headers=auth_headers).json()["id"]
+    recorder = make_recorder()
+    timestamp = recorder.record(user_id)
+
+    recorder.shutdown()
+
+    assert recorder.pending_count() == 0
+    assert last_login_of(user_id).replace(tzinfo=None) == timestamp.replace(tzinfo=None)
+
+def test_record_after_shutdown_is_written_off_the_calling_thread(make_recorder, writes):
+    recorder = make_recorder()
+    recorder.shutdown()
+
+    recorder.record(1)
+
+    wait_for(lambda: writes)
+    assert writes[0][0].keys() == {1}
+    assert writes[0][1] is not threading.current_thread()
@@ -0,0 +1,115 @@
+import pytest
+
+# 主要エンドポイントが発行するSQL文の数（N+1 や書き込み後の再読込の回帰を検出する）
+
+def setup_tasks(client, headers, tasks=10, categories=5, first_category=0):
+    category_ids = [
+        client.post("/api/categories", json={"name": f"Category {index}"}, headers=headers).json()["id"]
+        for index in range(first_category, first_category + categories)
+    ]
+    for index in range(tasks):
+        client.post("/api/tasks", json={
+            "title": f"Task {index}", "category_id": category_ids[index % categories]
+        }, headers=headers)
+    # 認証ユーザーをキャッシュに載せ、以降の計測から除外する
+    client.get("/auth/me", headers=headers)
+    return category_ids
+
+def test_task_list_loads_categories_in_one_query(client, auth_headers, statements):
+    setup_tasks(client, auth_headers)
+
+    statements.clear()
+    response = client.get("/api/tasks", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert all(task["category"] is not None for task in response.json())
+    # data_version の取得 + カテゴリをJOINしたタスク一覧
+    assert len(statements) == 2, statements
+
+def test_task_page_loads_categories_in_one_query(client, auth_headers, statements):
+    setup_tasks(client, auth_headers)
+
+    statements.clear()
+    response = client.get("/api/tasks", params={"limit": 5}, headers=auth_headers)
+
+    assert len(response.json()["items"]) == 5
+    assert len(statements) == 2, statements
+
+def test_create_task_with_category_is_one_write(client, auth_headers, statements):
+    category_ids = setup_tasks(client, auth_headers, tasks=0)
+
+    statements.clear()
+    response = client.post("/api/tasks", json={"title": "New", "category_id": category_ids[0]}, headers=auth_headers)
+
+    assert response.json()["category"]["name"] == "Category 0"
+    # INSERT ... RETURNING（カテゴリを含む）+ data_version の更新
+    assert len(statements) == 2, statements
+    assert statements[0].startswith("INSERT INTO tasks")
+    assert statements[1].startswith("UPDATE users")
+
+def test_update_task_with_category_is_one_write(client, auth_headers, statements):
+    category_ids = setup_tasks(client, auth_headers, tasks=1)
+    task_id = client.get("/api/tasks", headers=auth_headers).json()[0]["id"]
+
+    statements.clear()
+    response = client.put(f"/api/tasks/{task_id}", json={"category_id": category_ids[1]}, headers=auth_headers)
+
+    assert response.json()["category"]["name"] == "Category 1"
+    assert len(statements) == 2, statements
+    assert statements[0].startswith("UPDATE tasks")
+
+def test_delete_task_does_not_select_first(client, auth_headers, statements):
+    setup_tasks(client, auth_headers, tasks=1)
+    task_id = client.get("/api/tasks", headers=auth_headers).json()[0]["id"]
+
+    statements.clear()
+    response = client.delete(f"/api/tasks/{task_id}", headers=auth_headers)
+
+    assert response.status_code == 200
+    # DELETE + 削除記録 + 古い削除記録の整理 + data_version の更新
+    assert [statement.split()[0] for statement in statements] == ["DELETE", "INSERT", "DELETE", "UPDATE"]
+
+def test_missing_task_update_and_delete_return_404(client, auth_headers):
+    assert client.put("/api/tasks/999", json={"title": "x"}, headers=auth_headers).status_code == 404
+    assert client.delete("/api/tasks/999", headers=auth_headers).status_code == 404
+
+def test_category_writes_skip_refresh(client, auth_headers, statements):
+    client.get("/auth/me", headers=auth_headers)
+
+    statements.clear()
+    category = client.post("/api/categories", json={"name": "Home"}, headers=auth_headers).json()
+    assert [statement.split()[0] for statement in statements] == ["INSERT", "UPDATE"]
+
+    statements.clear()
+    client.put(f"/api/categories/{category['id']}", json={"color": "#ffffff"}, headers=auth_headers)
+    assert [statement.split()[0] for statement in statements] == ["UPDATE", "UPDATE"]
+
+def test_login_is_one_select_and_one_update(client, auth_headers, statements):
+    statements.clear()
+    response = client.post("/auth/login", json={"email": "alice@example.com", "password": "Passw0rd!x"})
+
+    assert response.status_code == 200
+    assert [statement.split()[0] for statement in statements] == ["SELECT", "UPDATE"]
+
+@pytest.mark.parametrize("path, params", [
+    ("/api/tasks", {}),
+    ("/api/tasks", {"limit": 50}),
+    ("/api/tasks", {"search": "Task"}),
+    ("/api/tasks/1", {}),
+    ("/api/categories", {}),
+    ("/api/tasks/stats", {}),
+    ("/api/sync", {}),
+])
+def test_read_statement_count_does_not_grow_with_data(client, auth_headers, statements, path, params):
+    # 件数やカテゴリ数が増えても発行するSQL文の数は変わらない
+    setup_tasks(client, auth_headers, tasks=1, categories=1)
+    statements.clear()
+    client.get(path, params=params, headers=auth_headers)
+    small = len(statements)
+
+    setup_tasks(client, auth_headers, tasks=40, categories=10, first_category=1)
+    statements.clear()
+    response = client.get(path, params=params, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert len(statements) == small, statements
@@ -0,0 +1,152 @@
+import os
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+import crud
+import database
+import models
+
+# PostgreSQL での実行計画の確認は TEST_POSTGRES_URL を指定した場合のみ実行
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+def query_plans(client, headers, path, params=None):
+    """1回のGETで実行された tasks / categories の SELECT と、その EXPLAIN QUERY PLAN"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and ("FROM tasks" in statement or "FROM categories" in statement):
+            executed.append((statement, parameters))
+
+    event.listen(database.engine, "before_cursor_execute", record)
+    try:
+        response = client.get(path, params=params, headers=headers)
+    finally:
+        event.remove(database.engine, "before_cursor_execute", record)
+    assert response.status_code == 200, response.text
+    assert executed, "no SELECT was recorded"
+
+    with database.engine.connect() as conn:
+        return [
+            (statement, [row[-1] for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)])
+            for statement, parameters in executed
+        ]
+
+def assert_no_full_scan(plans):
+    for statement, steps in plans:
+        for step in steps:
+            assert not step.startswith(("SCAN tasks", "SCAN categories")), f"{step}\n{statement}"
+
+def plan_text(plans):
+    return "\n".join(step for _, steps in plans for step in steps)
+
+@pytest.fixture
+def tasks(client, auth_headers):
+    client.post("/api/categories", json={"name": "Work"}, headers=auth_headers)
+    for index in range(3):
+        client.post("/api/tasks", json={"title": f"Task {index}", "category_id": 1}, headers=auth_headers)
+
+@pytest.mark.parametrize("params", [
+    {},
+    {"limit": 2},
+    {"is_completed": True, "priority": 2},
+    {"category_id": 1},
+    {"search": "Task"},
+])
+def test_task_list_uses_created_at_index(client, auth_headers, tasks, params):
+    plans = query_plans(client, auth_headers, "/api/tasks", params)
+
+    assert_no_full_scan(plans)
+    assert "ix_tasks_user_id_created_at" in plan_text(plans)
+    # 並び順はインデックスの順序で得られ、一時B-treeでのソートは発生しない
+    assert "TEMP B-TREE" not in plan_text(plans)
+
+def test_cursor_page_seeks_into_index(client, auth_headers, tasks):
+    cursor = client.get("/api/tasks", params={"limit": 1}, headers=auth_headers).json()["next_cursor"]
+
+    plans = query_plans(client, auth_headers, "/api/tasks", {"limit": 1, "cursor": cursor})
+
+    assert_no_full_scan(plans)
+    assert "ix_tasks_user_id_created_at (user_id=? AND created_at<?)" in plan_text(plans)
+
+def test_category_list_uses_name_index(client, auth_headers, tasks):
+    plans = query_plans(client, auth_headers, "/api/categories")
+
+    assert "ix_categories_user_id_name" in plan_text(plans)
+    assert "TEMP B-TREE" not in plan_text(plans)
+
+@pytest.mark.parametrize("path", ["/api/tasks/stats", "/api/sync"])
+def test_other_reads_avoid_full_scans(client, auth_headers, tasks, path):
+    assert_no_full_scan(query_plans(client, auth_headers, path))
+
+@pytest.fixture
+def postgres_tasks():
+    """TEST_POSTGRES_URL に50ユーザー × 400件のタスクを作り、(engine, ユーザーID) を返す（終了時に削除）"""
+    engine = create_engine(POSTGRES_URL)
+    try:
+        with engine.begin() as conn:
+            models.Base.metadata.drop_all(conn)
+            models.Base.metadata.create_all(conn)
+            conn.execute(models.User.__table__.insert(), [
+                {"email": f"user{index}@example.com", "username": f"user{index}", "hashed_password": "x"}
+                for index in range(50)
+            ])
+            conn.exec_driver_sql(
+                "INSERT INTO tasks (user_id, title, is_completed, priority, created_at)"
+                " SELECT users.id, 'task ' || g, g % 2 = 0, g % 3 + 1, now() - g * interval '1 minute'"
+                " FROM users CROSS JOIN generate_series(1, 400) AS g"
+            )
+            conn.exec_driver_sql("ANALYZE")
+            user_id = conn.exec_driver_sql("SELECT min(id) FROM users").scalar()
+        yield engine, user_id
+        with engine.begin() as conn:
+            models.Base.metadata.drop_all(conn)
+    finally:
+        engine.dispose()
+
+def postgres_plans(engine, read):
+    """read(db) の中で実行された tasks の SELECT と、その EXPLAIN の結果"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM tasks" in statement:
+            executed.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        with Session(engine) as db:
+            result = read(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert executed, "no SELECT was recorded"
+
+    with engine.connect() as conn:
+        plans = [
+            (statement, [row[0] for row in conn.exec_driver_sql("EXPLAIN " + statement, parameters)])
+            for statement, parameters in executed
+        ]
+    return plans, result
+
+def assert_no_seq_scan_on_tasks(plans):
+    for statement, steps in plans:
+        assert not any("Seq Scan on tasks" in step for step in steps), "\n".join(steps) + "\n" + statement
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+def test_postgres_task_list_uses_index(postgres_tasks):
+    engine, user_id = postgres_tasks
+
+    plans, tasks = postgres_plans(engine, lambda db: crud.get_tasks(db, user_id=user_id))
+
+    assert len(tasks) == 400
+    assert_no_seq_scan_on_tasks(plans)
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+def test_postgres_keyset_page_uses_index(postgres_tasks):
+    engine, user_id = postgres_tasks
+    with Session(engine) as db:
+        _, cursor = crud.get_task_page(db, user_id=user_id, limit=20)
+
+    plans, (tasks, _) = postgres_plans(engine, lambda db: crud.get_task_page(db, user_id=user_id, limit=20, cursor=cursor))
+
+    assert len(tasks) == 20
+    assert_no_seq_scan_on_tasks(plans)
+    assert "ix_tasks_user_id_created_at" in "\n".join(step for _, steps in plans for step in steps)
@@ -0,0 +1,156 @@
+import asyncio
+import sys
+import time
+import types
+import pytest
+from limits import parse
+from limits.storage import RedisStorage, storage_from_string
+from limits.strategies import STRATEGIES
+import security
+from security import api_rate_limit, auth_rate_limit
+
+class FakeRedis:
+    """テスト用のRedis互換サーバーの代用（moving-window のLuaスクリプトとリスト操作のみ）
+
+    スクリプトは limits の RedisStorage が登録するものを内容で判別し、同じ処理をPythonで行う。
+    """
+
+    def __init__(self):
+        self.lists = {}
+        self.expires = {}
+        self.calls_on_event_loop = 0
+
+    def register_script(self, script):
+        scripts = {
+            RedisStorage.SCRIPT_ACQUIRE_MOVING_WINDOW: self.acquire_moving_window,
+            RedisStorage.SCRIPT_MOVING_WINDOW: self.moving_window,
+            RedisStorage.SCRIPT_CLEAR_KEYS: self.clear_keys,
+        }
+        return scripts.get(script, self.unsupported)
+
+    def entries(self, key):
+        if self.expires.get(key, float("inf")) <= time.monotonic():
+            self.lists.pop(key, None)
+        try:
+            asyncio.get_running_loop()
+            self.calls_on_event_loop += 1
+        except RuntimeError:
+            pass
+        return self.lists.setdefault(key, [])
+
+    def acquire_moving_window(self, keys, args):
+        timestamp, limit, expiry, amount = args
+        entries = self.entries(keys[0])
+        if amount > limit:
+            return False
+        if len(entries) > limit - amount and entries[limit - amount] >= timestamp - expiry:
+            return False
+        entries[:0] = [timestamp] * amount
+        del entries[limit:]
+        self.expires[keys[0]] = time.monotonic() + expiry
+        return True
+
+    def moving_window(self, keys, args):
+        window_start, limit = args
+        in_window = [entry for entry in self.entries(keys[0])[:limit] if entry >= window_start]
+        if in_window:
+            return [str(in_window[-1]).encode(), len(in_window)]
+        return None
+
+    def clear_keys(self, keys):
+        prefix = keys[0].rstrip("*")
+        cleared = [key for key in self.lists if key.startswith(prefix)]
+        for key in cleared:
+            del self.lists[key]
+        return len(cleared)
+
+    def unsupported(self, keys, args=()):
+        raise NotImplementedError("script is not supported by FakeRedis")
+
+@pytest.fixture
+def api_limit(monkeypatch):
+    """API全般の上限を 3/minute に下げる"""
+    monkeypatch.setattr(api_rate_limit, "item", parse("3/minute"))
+    return 3
+
+def test_api_limit_returns_429_with_retry_after(client, auth_headers, api_limit):
+    for _ in range(api_limit):
+        assert client.get("/api/tasks", headers=auth_headers).status_code == 200
+
+    response = client.get("/api/tasks", headers=auth_headers)
+
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 60
+    assert response.json()["detail"]["error"] == "Rate limit exceeded"
+    assert response.headers["x-content-type-options"] == "nosniff"
+
+def test_limit_is_counted_per_user(client, make_user, api_limit):
+    # 同じIPアドレスからでも、JWTのユーザーごとに別々に数える
+    alice = make_user("alice")
+    bob = make_user("bob")
+    for _ in range(api_limit):
+        client.get("/api/categories", headers=alice)
+
+    assert client.get("/api/categories", headers=alice).status_code == 429
+    assert client.get("/api/categories", headers=bob).status_code == 200
+
+def test_limit_applies_across_routes(client, auth_headers, api_limit):
+    client.get("/api/tasks", headers=auth_headers)
+    client.get("/api/categories", headers=auth_headers)
+    client.get("/auth/me", headers=auth_headers)
+
+    assert client.get("/api/tasks/stats", headers=auth_headers).status_code == 429
+
+def test_auth_limit_throttles_login_by_ip(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(auth_rate_limit, "item", parse("2/minute"))
+    credentials = {"email": "alice@example.com", "password": "wrong-password"}
+    for _ in range(2):
+        assert client.post("/auth/login", json=credentials).status_code == 401
+
+    assert client.post("/auth/login", json=credentials).status_code == 429
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """RATE_LIMIT_STORAGE_URI=redis://... の接続先（同じURLのストレージは同じカウンタを共有）"""
+    server = FakeRedis()
+    redis = types.SimpleNamespace(__version__="5.0.0", from_url=lambda url, **options: server, RedisError=Exception)
+    monkeypatch.setitem(sys.modules, "redis", redis)
+    return server
+
+def redis_strategy():
+    """1ワーカー分のレート制限（ワーカーごとに別のストレージ接続を持つ）"""
+    storage = storage_from_string("redis://localhost:6379/1")
+    return STRATEGIES[security.settings.rate_limit_strategy](storage)
+
+def test_counters_are_shared_through_redis(client, auth_headers, api_limit, redis_server, monkeypatch):
+    # 別ワーカーが同じRedisに記録したリクエストも上限に含まれる
+    monkeypatch.setattr(security, "rate_limit_strategy", redis_strategy())
+    other_worker = redis_strategy()
+    user_id = client.get("/auth/me", headers=auth_headers).json()["id"]
+    for _ in range(api_limit - 1):
+        assert other_worker.hit(api_rate_limit.item, "api", f"user:{user_id}")
+
+    response = client.get("/api/tasks", headers=auth_headers)
+
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 60
+    # 通信を伴うストレージはイベントループ上ではなくスレッドプールから使う
+    assert redis_server.calls_on_event_loop == 0
+
+def test_memory_storage_is_counted_without_the_threadpool(client, auth_headers, monkeypatch):
+    # プロセス内のカウンタはリクエストごとにスレッドプールを使わない
+    def unexpected(*args, **kwargs):
+        raise AssertionError("rate limit used the threadpool")
+
+    monkeypatch.setattr(security, "run_in_threadpool", unexpected)
+
+    assert client.get("/api/categories", headers=auth_headers).status_code == 200
+
+def test_storage_failure_lets_requests_through(client, auth_headers, api_limit, monkeypatch):
+    def unavailable(*args):
+        raise ConnectionError("storage is down")
+
+    monkeypatch.setattr(security.rate_limit_strategy, "hit", unavailable)
+
+    for _ in range(api_limit + 1):
+        assert client.get("/api/tasks", headers=auth_headers).status_code == 200
@@ -0,0 +1,39 @@
+import main
+import security
+
+SECURITY_HEADER_NAMES = [name.decode() for name, _ in security.SECURITY_HEADERS]
+
+def assert_security_headers(response):
+    for name in SECURITY_HEADER_NAMES:
+        assert name in response.headers, name
+
+def test_responses_have_security_headers(client):
+    response = client.get("/")
+
+    assert_security_headers(response)
+
+def test_content_length_over_limit_returns_413_with_security_headers(client, auth_headers):
+    body = b"x" * (main.settings.max_request_size + 1)
+
+    response = client.post("/api/tasks", content=body, headers=dict(auth_headers, **{"Content-Type": "application/json"}))
+
+    assert response.status_code == 413
+    assert_security_headers(response)
+
+def test_chunked_body_over_limit_returns_413_with_security_headers(client, auth_headers):
+    # Content-Length のないチャンク転送でも、受信した本文の累計で上限を判定する
+    def body():
+        for _ in range(main.settings.max_request_size // 65536 + 2):
+            yield b" " * 65536
+
+    response = client.post("/api/tasks", content=body(), headers=dict(auth_headers, **{"Content-Type": "application/json"}))
+
+    assert "content-length" not in response.request.headers
+    assert response.status_code == 413
+    assert_security_headers(response)
+
+def test_body_under_limit_is_accepted(client, auth_headers):
+    response = client.post("/api/tasks", json={"title": "Small", "description": "x" * 1000}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert_security_headers(response)
@@ -0,0 +1,120 @@
+import time
+from datetime import datetime, timedelta, timezone
+import pytest
+import crud
+import database
+import models
+import task_import
+
+@pytest.fixture
+def no_overlap(monkeypatch):
+    """重複取得の幅をなくし、差分だけが返ることを確認できるようにする
+
+    SQLite の時刻は秒単位のため、トークンの前後で1秒以上空ける。
+    """
+    monkeypatch.setattr(crud, "SYNC_OVERLAP", timedelta(0))
+
+def sync(client, headers, since=None):
+    response = client.get("/api/sync", params={"since": since} if since else None, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_first_sync_returns_everything(client, auth_headers):
+    client.post("/api/categories", json={"name": "Work"}, headers=auth_headers)
+    client.post("/api/tasks", json={"title": "A"}, headers=auth_headers)
+
+    changes = sync(client, auth_headers)
+
+    assert changes["full"] is True
+    assert [task["title"] for task in changes["tasks"]] == ["A"]
+    assert [category["name"] for category in changes["categories"]] == ["Work"]
+    assert changes["next_token"]
+
+def test_since_token_returns_only_changes(client, auth_headers, no_overlap):
+    kept = client.post("/api/tasks", json={"title": "Unchanged"}, headers=auth_headers).json()
+    edited = client.post("/api/tasks", json={"title": "Edited"}, headers=auth_headers).json()
+    time.sleep(1.1)
+    token = sync(client, auth_headers)["next_token"]
+    time.sleep(1.1)
+
+    client.put(f"/api/tasks/{edited['id']}", json={"is_completed": True}, headers=auth_headers)
+    client.post("/api/tasks", json={"title": "New"}, headers=auth_headers)
+    client.post("/api/categories", json={"name": "Home"}, headers=auth_headers)
+    changes = sync(client, auth_headers, token)
+
+    assert changes["full"] is False
+    assert sorted(task["title"] for task in changes["tasks"]) == ["Edited", "New"]
+    assert kept["id"] not in [task["id"] for task in changes["tasks"]]
+    assert [category["name"] for category in changes["categories"]] == ["Home"]
+
+def test_deletions_are_reported_as_tombstones(client, auth_headers, no_overlap):
+    category = client.post("/api/categories", json={"name": "Work"}, headers=auth_headers).json()
+    task = client.post("/api/tasks", json={"title": "A"}, headers=auth_headers).json()
+    time.sleep(1.1)
+    token = sync(client, auth_headers)["next_token"]
+    time.sleep(1.1)
+
+    client.delete(f"/api/tasks/{task['id']}", headers=auth_headers)
+    client.delete(f"/api/categories/{category['id']}", headers=auth_headers)
+    changes = sync(client, auth_headers, token)
+
+    assert changes["deleted_task_ids"] == [task["id"]]
+    assert changes["deleted_category_ids"] == [category["id"]]
+    assert changes["tasks"] == [] and changes["categories"] == []
+
+def test_import_committed_after_token_is_synced(client, auth_headers, no_overlap):
+    user_id = client.get("/auth/me", headers=auth_headers).json()["id"]
+    importer = task_import.TaskImporter(user_id)
+    importer.import_batch([(1, {"title": "Imported", "category_name": "Inbox"})])
+    time.sleep(1.1)
+    # インポートのトランザクション中に同期したクライアントのトークン
+    token = sync(client, auth_headers)["next_token"]
+    time.sleep(1.1)
+    try:
+        importer.commit()
+    finally:
+        importer.close()
+
+    changes = sync(client, auth_headers, token)
+
+    assert [task["title"] for task in changes["tasks"]] == ["Imported"]
+    assert [category["name"] for category in changes["categories"]] == ["Inbox"]
+
+def test_token_older_than_retention_falls_back_to_full_sync(client, auth_headers):
+    client.post("/api/tasks", json={"title": "A"}, headers=auth_headers)
+    issued = crud.decode_sync_token(sync(client, auth_headers)["next_token"])
+    old_token = crud.encode_sync_token(issued - timedelta(days=31))
+
+    changes = sync(client, auth_headers, old_token)
+
+    assert changes["full"] is True
+    assert [task["title"] for task in changes["tasks"]] == ["A"]
+
+def test_invalid_token_returns_400(client, auth_headers):
+    response = client.get("/api/sync", params={"since": "not-a-token"}, headers=auth_headers)
+
+    assert response.status_code == 400
+
+def test_sync_does_not_write(client, auth_headers, statements):
+    client.get("/auth/me", headers=auth_headers)
+    token = sync(client, auth_headers)["next_token"]
+
+    statements.clear()
+    sync(client, auth_headers, token)
+
+    assert all(statement.lstrip().upper().startswith("SELECT") for statement in statements), statements
+
+def test_expired_tombstones_are_pruned_on_delete(client, auth_headers):
+    task = client.post("/api/tasks", json={"title": "A"}, headers=auth_headers).json()
+    with database.SessionLocal() as db:
+        db.add(models.SyncTombstone(
+            user_id=1, entity_type="task", entity_id=999,
+            deleted_at=datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=31)
+        ))
+        db.commit()
+
+    client.delete(f"/api/tasks/{task['id']}", headers=auth_headers)
+
+    with database.SessionLocal() as db:
+        remaining = [tombstone.entity_id for tombstone in db.query(models.SyncTombstone).all()]
+    assert remaining == [task["id"]]
@@ -0,0 +1,68 @@
+def create_tasks(client, headers, *titles):
+    return [client.post("/api/tasks", json={"title": title}, headers=headers).json()["id"] for title in titles]
+
+def post_batch(client, headers, **batch):
+    return client.post("/api/tasks/batch", json=batch, headers=headers)
+
+def titles(client, headers):
+    return sorted(task["title"] for task in client.get("/api/tasks", headers=headers).json())
+
+def test_mixed_batch_reports_each_operation_by_index(client, auth_headers):
+    first, second, third = create_tasks(client, auth_headers, "A", "B", "C")
+
+    response = post_batch(
+        client, auth_headers,
+        create=[{"title": "New 1"}, {"title": "New 2", "priority": 3}],
+        update=[{"id": first, "is_completed": True}, {"id": second, "title": "B2"}],
+        delete=[third],
+    )
+
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    created = [result for result in results if result["op"] == "create"]
+    assert [(result["index"], result["status"]) for result in created] == [(0, "ok"), (1, "ok")]
+    assert [(result["op"], result["index"], result["id"], result["status"]) for result in results if result["op"] != "create"] == [
+        ("update", 0, first, "ok"),
+        ("update", 1, second, "ok"),
+        ("delete", 0, third, "ok"),
+    ]
+    assert client.get(f"/api/tasks/{created[1]['id']}", headers=auth_headers).json()["title"] == "New 2"
+    assert client.get(f"/api/tasks/{first}", headers=auth_headers).json()["is_completed"] is True
+    assert titles(client, auth_headers) == ["A", "B2", "New 1", "New 2"]
+
+def test_other_users_tasks_are_not_found(client, make_user):
+    alice = make_user("alice")
+    bob = make_user("bob")
+    (bobs,) = create_tasks(client, bob, "Bob's")
+
+    response = post_batch(client, alice, update=[{"id": bobs, "title": "Stolen"}], delete=[bobs, 9999])
+
+    assert [(result["op"], result["id"], result["status"]) for result in response.json()["results"]] == [
+        ("update", bobs, "not_found"),
+        ("delete", bobs, "not_found"),
+        ("delete", 9999, "not_found"),
+    ]
+    assert titles(client, bob) == ["Bob's"]
+
+def test_update_then_delete_of_the_same_task(client, auth_headers):
+    (task_id,) = create_tasks(client, auth_headers, "A")
+
+    response = post_batch(client, auth_headers, update=[{"id": task_id, "title": "A2"}], delete=[task_id])
+
+    assert [result["status"] for result in response.json()["results"]] == ["ok", "ok"]
+    assert client.get(f"/api/tasks/{task_id}", headers=auth_headers).status_code == 404
+
+def test_constraint_error_rolls_back_the_whole_batch(client, auth_headers):
+    first, second = create_tasks(client, auth_headers, "A", "B")
+    version = client.get("/api/tasks", headers=auth_headers).headers["etag"]
+
+    response = post_batch(
+        client, auth_headers,
+        create=[{"title": "New"}],
+        update=[{"id": first, "title": None}],
+        delete=[second],
+    )
+
+    assert response.status_code == 400
+    assert titles(client, auth_headers) == ["A", "B"]
+    assert client.get("/api/tasks", headers=auth_headers).headers["etag"] == version
@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+import os
+import pytest
+import database
+import models
+import task_export
+
+# 100万件のエクスポートは時間がかかるため RUN_SLOW_TESTS=1 の場合のみ実行
+RUN_SLOW_TESTS = os.environ.get("RUN_SLOW_TESTS") == "1"
+# エクスポート中に増えてよい常駐メモリ（RSS）の上限
+EXPORT_RSS_CEILING = 64 * 1024 * 1024
+
+def insert_tasks(user_id: int, count: int, chunk_size: int = 10000):
+    """タスクを直接INSERT（大量件数でもメモリを使わないよう分割）"""
+    with database.engine.begin() as conn:
+        for start in range(0, count, chunk_size):
+            conn.execute(models.Task.__table__.insert(), [
+                {"user_id": user_id, "title": f"Task {index}", "description": "lorem ipsum dolor sit amet"}
+                for index in range(start, min(start + chunk_size, count))
+            ])
+
+def current_rss() -> int:
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+def test_export_ndjson(client, auth_headers):
+    category = client.post("/api/categories", json={"name": "Work"}, headers=auth_headers).json()
+    client.post("/api/tasks", json={"title": "A", "category_id": category["id"]}, headers=auth_headers)
+    client.post("/api/tasks", json={"title": "B", "description": "line 1\nline 2"}, headers=auth_headers)
+
+    response = client.get("/api/tasks/export", headers=auth_headers)
+
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [(record["title"], record["category_name"]) for record in records] == [("A", "Work"), ("B", None)]
+    assert records[1]["description"] == "line 1\nline 2"
+
+def test_export_csv(client, auth_headers):
+    client.post("/api/tasks", json={"title": "Hello, world", "priority": 1}, headers=auth_headers)
+
+    response = client.get("/api/tasks/export", params={"format": "csv"}, headers=auth_headers)
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(row["title"], row["priority"]) for row in rows] == [("Hello, world", "1")]
+
+def test_empty_csv_export_has_header(client, auth_headers):
+    response = client.get("/api/tasks/export", params={"format": "csv"}, headers=auth_headers)
+
+    assert response.text.strip() == ",".join(task_export.EXPORT_COLUMNS)
+
+def test_export_only_includes_own_tasks(client, make_user):
+    alice = make_user("alice")
+    bob = make_user("bob")
+    client.post("/api/tasks", json={"title": "Bob's"}, headers=bob)
+
+    assert client.get("/api/tasks/export", headers=alice).text == ""
+
+def test_export_is_produced_in_batches(client, auth_headers):
+    insert_tasks(user_id=1, count=2500)
+
+    chunks = list(task_export.iter_task_export(1, "ndjson"))
+
+    # 1000件ずつのバッチを逐次生成し、全件をまとめた1つの本文は作らない
+    assert [chunk.count(b"\n") for chunk in chunks] == [1000, 1000, 500]
+
+@pytest.mark.skipif(not RUN_SLOW_TESTS, reason="RUN_SLOW_TESTS is not set")
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="RSS is read from /proc")
+@pytest.mark.parametrize("export_format", ["ndjson", "csv"])
+def test_million_row_export_stays_under_rss_ceiling(client, auth_headers, export_format):
+    insert_tasks(user_id=1, count=1_000_000)
+
+    baseline = peak = current_rss()
+    exported = 0
+    for chunk in task_export.iter_task_export(1, export_format):
+        exported += chunk.count(b"\n")
+        peak = max(peak, current_rss())
+
+    assert exported == 1_000_000 + (export_format == "csv")
+    assert peak - baseline < EXPORT_RSS_CEILING
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import main
+import task_import
+
+def ndjson(count, **fields):
+    return "".join(json.dumps(dict({"title": f"Task {index}"}, **fields)) + "\n" for index in range(count)).encode()
+
+def chunked(body, size):
+    """Content-Length なしのチャンク転送で送る本文"""
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+def post_chunks(headers, chunks, disconnect=False):
+    """本文をチャンクごとにアプリへ渡して POST /api/tasks/import を呼ぶ
+
+    TestClient は本文をまとめて1回で渡すため、ASGIを直接呼び出して逐次受信を再現する。
+    disconnect=True の場合は最後のチャンクの後にクライアントが切断する。
+    """
+    messages = [{"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks]
+    messages.append({"type": "http.disconnect"} if disconnect else {"type": "http.request", "body": b"", "more_body": False})
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/api/tasks/import", "raw_path": b"/api/tasks/import", "query_string": b"",
+        "root_path": "", "client": ("testclient", 50000), "server": ("testserver", 80),
+        "headers": [(b"host", b"testserver")] + [
+            (name.lower().encode(), value.encode()) for name, value in headers.items()
+        ],
+    }
+    try:
+        asyncio.run(main.app(scope, receive, send))
+    except Exception:
+        pass
+    return next((message["status"] for message in sent if message["type"] == "http.response.start"), None)
+
+def task_count(client, headers):
+    return client.get("/api/tasks/stats", headers=headers).json()["total"]
+
+def test_import_ndjson_with_categories_and_errors(client, auth_headers):
+    body = (
+        b'{"title": "A", "category_name": "Work"}\n'
+        b'not json\n'
+        b'{"title": "B", "category_name": "Work", "priority": 3}\n'
+        b'{"priority": 2}\n'
+    )
+
+    response = client.post("/api/tasks/import", content=body, headers=auth_headers)
+
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["imported"] == 2
+    assert result["categories_created"] == 1
+    assert [error["line"] for error in result["errors"]] == [2, 4]
+    assert task_count(client, auth_headers) == 2
+
+def test_import_csv_with_quoted_newline(client, auth_headers):
+    body = 'title,description,priority\n"A","first\nsecond",3\nB,,1\n'.encode()
+
+    response = client.post(
+        "/api/tasks/import", content=body, headers=dict(auth_headers, **{"Content-Type": "text/csv"})
+    )
+
+    assert response.json()["imported"] == 2
+    tasks = client.get("/api/tasks", headers=auth_headers).json()
+    assert [task["description"] for task in tasks if task["title"] == "A"] == ["first\nsecond"]
+
+def test_import_spans_batches_in_one_commit(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(task_import, "BATCH_SIZE", 3)
+
+    response = client.post("/api/tasks/import", content=chunked(ndjson(10), 64), headers=auth_headers)
+
+    assert response.json()["imported"] == 10
+    assert task_count(client, auth_headers) == 10
+
+def test_import_in_chunks_commits_every_batch(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(task_import, "BATCH_SIZE", 2)
+
+    assert post_chunks(auth_headers, chunked(ndjson(9), 32)) == 200
+    assert task_count(client, auth_headers) == 9
+
+def test_oversized_import_keeps_no_earlier_batches(client, auth_headers, monkeypatch):
+    # 上限超過で中断した場合、それまでに追加したバッチもロールバックされる
+    monkeypatch.setattr(task_import, "BATCH_SIZE", 2)
+    body = ndjson(20, category_name="Imported")
+    monkeypatch.setattr(main.settings, "import_max_request_size", len(body) // 2)
+
+    assert post_chunks(auth_headers, chunked(body, 32)) == 413
+    assert task_count(client, auth_headers) == 0
+    assert client.get("/api/categories", headers=auth_headers).json() == []
+
+def test_disconnected_import_keeps_no_earlier_batches(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(task_import, "BATCH_SIZE", 2)
+    body = ndjson(20, category_name="Imported")
+
+    post_chunks(auth_headers, chunked(body[:len(body) // 2], 32), disconnect=True)
+
+    assert task_count(client, auth_headers) == 0
+    assert client.get("/api/categories", headers=auth_headers).json() == []
+
+def test_iter_lines_handles_lines_split_across_chunks():
+    async def stream():
+        for chunk in [b"ab", b"c\nde", b"f", b"\n\ng", b"h"]:
+            yield chunk
+
+    async def collect():
+        return [line async for line in task_import.iter_lines(stream(), max_size=1024)]
+
+    assert asyncio.run(collect()) == [b"abc", b"def", b"", b"gh"]
+
+def test_iter_lines_long_line_in_small_chunks():
+    line = b"x" * 200_000
+
+    async def stream():
+        for start in range(0, len(line), 100):
+            yield line[start:start + 100]
+        yield b"\nend"
+
+    async def collect():
+        return [line async for line in task_import.iter_lines(stream(), max_size=1_000_000)]
+
+    assert asyncio.run(collect()) == [line, b"end"]
@@ -0,0 +1,142 @@
+import os
+import time
+from datetime import datetime, timedelta
+import pytest
+import crud
+import database
+import models
+
+# テーブルを100万件まで増やしてページの取得時間を比べるため RUN_SLOW_TESTS=1 の場合のみ実行
+RUN_SLOW_TESTS = os.environ.get("RUN_SLOW_TESTS") == "1"
+PAGE_TIMING_REPEAT = 20
+
+def create_tasks(client, headers, count):
+    ids = []
+    for index in range(count):
+        response = client.post("/api/tasks", json={"title": f"Task {index}"}, headers=headers)
+        assert response.status_code == 200, response.text
+        ids.append(response.json()["id"])
+    return ids
+
+def walk_pages(client, headers, limit, **params):
+    """next_cursor をたどって全ページを取得（同じカーソルが返ったら失敗）"""
+    pages = []
+    cursor = None
+    seen_cursors = set()
+    while True:
+        query = dict(params, limit=limit)
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get("/api/tasks", params=query, headers=headers)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        pages.append([task["id"] for task in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+        assert cursor not in seen_cursors, "pagination returned the same cursor twice"
+        seen_cursors.add(cursor)
+
+def test_second_page_continues_after_first(client, auth_headers):
+    # 同じ秒内に作成されたタスクでも、2ページ目は1ページ目の続きになる
+    ids = create_tasks(client, auth_headers, 5)
+
+    first = client.get("/api/tasks", params={"limit": 2}, headers=auth_headers).json()
+    second = client.get(
+        "/api/tasks", params={"limit": 2, "cursor": first["next_cursor"]}, headers=auth_headers
+    ).json()
+
+    assert [task["id"] for task in first["items"]] == ids[::-1][:2]
+    assert [task["id"] for task in second["items"]] == ids[::-1][2:4]
+    assert second["next_cursor"] != first["next_cursor"]
+
+def test_walk_every_page_to_the_end(client, auth_headers):
+    ids = create_tasks(client, auth_headers, 23)
+
+    pages = walk_pages(client, auth_headers, limit=5)
+
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert [task_id for page in pages for task_id in page] == ids[::-1]
+
+def test_pages_respect_filters(client, auth_headers):
+    ids = create_tasks(client, auth_headers, 6)
+    for task_id in ids[::2]:
+        client.put(f"/api/tasks/{task_id}", json={"is_completed": True}, headers=auth_headers)
+
+    pages = walk_pages(client, auth_headers, limit=2, is_completed=True)
+
+    assert [task_id for page in pages for task_id in page] == ids[::2][::-1]
+
+def test_exact_multiple_of_limit_ends_without_cursor(client, auth_headers):
+    create_tasks(client, auth_headers, 4)
+
+    pages = walk_pages(client, auth_headers, limit=2)
+
+    assert [len(page) for page in pages] == [2, 2]
+
+def test_pages_only_include_own_tasks(client, make_user):
+    alice = make_user("alice")
+    bob = make_user("bob")
+    alice_ids = create_tasks(client, alice, 3)
+    create_tasks(client, bob, 3)
+
+    pages = walk_pages(client, alice, limit=2)
+
+    assert [task_id for page in pages for task_id in page] == alice_ids[::-1]
+
+def test_invalid_cursor_returns_400(client, auth_headers):
+    response = client.get("/api/tasks", params={"limit": 2, "cursor": "not-a-cursor"}, headers=auth_headers)
+
+    assert response.status_code == 400
+
+def test_cursor_round_trip():
+    task = type("Task", (), {"created_at": datetime(2024, 1, 2, 3, 4, 5, 600), "id": 42})()
+
+    assert crud.decode_task_cursor(crud.encode_task_cursor(task)) == (task.created_at, 42)
+
+def insert_tasks(user_id: int, start: int, stop: int, chunk_size: int = 10000):
+    """タスク start〜stop-1 を1秒間隔の作成時刻で直接INSERT（大量件数でもメモリを使わないよう分割）
+
+    同じ秒に大量の行があると、カーソルと同じ作成時刻の行を読み飛ばす分だけ遅くなるため、
+    APIから作成した場合と同じく作成時刻をずらす（SQLite で保存形式をカーソルとそろえるためマイクロ秒を付ける）。
+    """
+    first_created_at = datetime(2020, 1, 1, 0, 0, 0, 500000)
+    with database.engine.begin() as conn:
+        for chunk_start in range(start, stop, chunk_size):
+            conn.execute(models.Task.__table__.insert(), [
+                {"user_id": user_id, "title": f"Task {index}", "created_at": first_created_at + timedelta(seconds=index)}
+                for index in range(chunk_start, min(chunk_start + chunk_size, stop))
+            ])
+
+def page_ms(user_id: int, cursor=None) -> float:
+    """50件のページ取得の中央値（ミリ秒）"""
+    samples = []
+    with database.SessionLocal() as db:
+        for _ in range(PAGE_TIMING_REPEAT):
+            started = time.perf_counter()
+            tasks, _ = crud.get_task_page(db, user_id=user_id, limit=50, cursor=cursor)
+            samples.append((time.perf_counter() - started) * 1000)
+            assert len(tasks) == 50
+            db.expunge_all()
+    return sorted(samples)[len(samples) // 2]
+
+@pytest.mark.skipif(not RUN_SLOW_TESTS, reason="RUN_SLOW_TESTS is not set")
+def test_page_latency_stays_flat_as_the_table_grows(client, auth_headers):
+    # キーセットページングは OFFSET と違い、読み飛ばす件数に比例して遅くならない
+    # 先頭ページと、テーブルの中ほどのカーソルからのページを 1万・10万・100万件で計測する
+    user_id = client.get("/auth/me", headers=auth_headers).json()["id"]
+    timings = {}
+    total = 0
+    for size in (10_000, 100_000, 1_000_000):
+        insert_tasks(user_id, total, size)
+        total = size
+        with database.SessionLocal() as db:
+            middle = db.query(models.Task).filter(models.Task.user_id == user_id).order_by(models.Task.id).offset(size // 2).first()
+            cursor = crud.encode_task_cursor(middle)
+        timings[size] = (page_ms(user_id), page_ms(user_id, cursor))
+
+    print({size: f"first {first:.2f} ms, middle {middle:.2f} ms" for size, (first, middle) in timings.items()})
+    for position in (0, 1):
+        smallest = timings[10_000][position]
+        # 件数が100倍になっても、ページの取得時間はほぼ変わらない（計測の揺れとして3倍+2msまで許容）
+        assert timings[1_000_000][position] < smallest * 3 + 2, timings
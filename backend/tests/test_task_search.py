@@ -0,0 +1,128 @@
+import importlib.util
+import os
+import time
+import pytest
+from sqlalchemy import create_engine, select
+import crud
+import models
+
+# PostgreSQL（pg_trgm）でのインデックス利用の確認は TEST_POSTGRES_URL を指定した場合のみ実行
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+# 10万件・100万件での検索時間の比較は時間がかかるため RUN_SLOW_TESTS=1 の場合のみ実行
+RUN_SLOW_TESTS = os.environ.get("RUN_SLOW_TESTS") == "1"
+SEARCH_REPEAT = 5
+
+def titles(client, headers, **params):
+    response = client.get("/api/tasks", params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return [task["title"] for task in response.json()]
+
+def test_search_matches_title_and_description(client, auth_headers):
+    client.post("/api/tasks", json={"title": "Buy milk"}, headers=auth_headers)
+    client.post("/api/tasks", json={"title": "Groceries", "description": "milk and eggs"}, headers=auth_headers)
+    client.post("/api/tasks", json={"title": "Write report"}, headers=auth_headers)
+
+    assert sorted(titles(client, auth_headers, search="MILK")) == ["Buy milk", "Groceries"]
+
+def test_ranked_search_puts_title_matches_first(client, auth_headers):
+    # 作成順（新しい順）では説明一致が先頭になるが、関連度順ではタイトル一致が先になる
+    client.post("/api/tasks", json={"title": "Milk"}, headers=auth_headers)
+    client.post("/api/tasks", json={"title": "Groceries", "description": "milk"}, headers=auth_headers)
+
+    assert titles(client, auth_headers, search="milk") == ["Groceries", "Milk"]
+    assert titles(client, auth_headers, search="milk", ranked=True) == ["Milk", "Groceries"]
+
+def test_ranked_search_cannot_be_paginated(client, auth_headers):
+    response = client.get("/api/tasks", params={"search": "x", "ranked": True, "limit": 10}, headers=auth_headers)
+
+    assert response.status_code == 400
+
+def load_migration_004():
+    path = os.path.join(os.path.dirname(__file__), "..", "alembic", "versions", "004_add_task_search_indexes.py")
+    spec = importlib.util.spec_from_file_location("migration_004", path)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    return migration
+
+def create_trigram_indexes(conn):
+    """マイグレーション 004 を適用し、pg_trgm のインデックスを作成"""
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    with Operations.context(MigrationContext.configure(conn)):
+        load_migration_004().upgrade()
+
+@pytest.fixture
+def postgres_conn():
+    """TEST_POSTGRES_URL のデータベースに空のテーブルを作った接続（終了時に削除）"""
+    engine = create_engine(POSTGRES_URL)
+    try:
+        with engine.begin() as conn:
+            models.Base.metadata.drop_all(conn)
+            models.Base.metadata.create_all(conn)
+            yield conn
+            models.Base.metadata.drop_all(conn)
+    finally:
+        engine.dispose()
+
+def insert_search_user(conn) -> int:
+    return conn.execute(models.User.__table__.insert().returning(models.User.id), {
+        "email": "search@example.com", "username": "search", "hashed_password": "x",
+    }).scalar_one()
+
+def search_query(conn, user_id: int, search: str):
+    query = crud.filter_tasks(select(models.Task), "postgresql", user_id=user_id, search=search)
+    compiled = query.compile(dialect=conn.dialect)
+    return str(compiled), compiled.params
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+def test_postgres_search_uses_trigram_index(postgres_conn):
+    conn = postgres_conn
+    create_trigram_indexes(conn)
+    user_id = insert_search_user(conn)
+    conn.execute(models.Task.__table__.insert(), [
+        {"user_id": user_id, "title": f"task {index}", "description": f"description {index}"}
+        for index in range(5000)
+    ] + [{"user_id": user_id, "title": "needle in a haystack"}])
+    conn.exec_driver_sql("ANALYZE tasks")
+
+    sql, params = search_query(conn, user_id, "needle")
+    plan = "\n".join(row[0] for row in conn.exec_driver_sql("EXPLAIN " + sql, params))
+
+    assert "ix_tasks_title_trgm" in plan, plan
+    assert "Seq Scan on tasks" not in plan, plan
+
+@pytest.mark.skipif(not RUN_SLOW_TESTS, reason="RUN_SLOW_TESTS is not set")
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+@pytest.mark.parametrize("count", [10_000, 100_000, 1_000_000])
+def test_trigram_index_speeds_up_search(postgres_conn, count):
+    # 同じデータで、インデックスなし（ILIKE の全件走査）と pg_trgm のインデックスありの検索時間を比べる
+    # 計測結果は -rP（成功したテストの出力を表示）で確認できる
+    conn = postgres_conn
+    user_id = insert_search_user(conn)
+    conn.exec_driver_sql(
+        "INSERT INTO tasks (user_id, title, description, is_completed, priority)"
+        " SELECT %(user_id)s, 'task ' || g, 'description ' || md5(g::text), false, 2"
+        " FROM generate_series(1, %(count)s) AS g",
+        {"user_id": user_id, "count": count},
+    )
+    conn.execute(models.Task.__table__.insert(), {"user_id": user_id, "title": "needle in a haystack"})
+    sql, params = search_query(conn, user_id, "needle")
+
+    def search_ms() -> float:
+        conn.exec_driver_sql("ANALYZE tasks")
+        samples = []
+        for _ in range(SEARCH_REPEAT):
+            started = time.perf_counter()
+            rows = conn.exec_driver_sql(sql, params).all()
+            samples.append((time.perf_counter() - started) * 1000)
+            assert len(rows) == 1
+        return sorted(samples)[len(samples) // 2]
+
+    ilike_ms = search_ms()
+    create_trigram_indexes(conn)
+    trigram_ms = search_ms()
+
+    print(f"{count} tasks: ILIKE {ilike_ms:.2f} ms, trigram index {trigram_ms:.2f} ms")
+    if count >= 100_000:
+        assert trigram_ms < ilike_ms
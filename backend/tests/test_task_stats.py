@@ -0,0 +1,44 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+def test_stats_counts(client, auth_headers):
+    category = client.post("/api/categories", json={"name": "Work"}, headers=auth_headers).json()
+    past = (datetime.now(timezone.utc) - timedelta(days=1)).replace(tzinfo=None).isoformat()
+    client.post("/api/tasks", json={"title": "A", "priority": 1, "category_id": category["id"]}, headers=auth_headers)
+    client.post("/api/tasks", json={"title": "B", "priority": 3, "due_date": past}, headers=auth_headers)
+    done = client.post("/api/tasks", json={"title": "C", "priority": 1}, headers=auth_headers).json()
+    client.put(f"/api/tasks/{done['id']}", json={"is_completed": True}, headers=auth_headers)
+
+    stats = client.get("/api/tasks/stats", headers=auth_headers).json()
+
+    assert stats["total"] == 3
+    assert stats["completed"] == 1
+    assert stats["active"] == 2
+    assert stats["overdue"] == 1
+    assert stats["by_priority"] == {"1": 2, "3": 1}
+
+def test_stats_etag_changes_when_task_becomes_overdue(client, auth_headers):
+    # データの変更がなくても、期限を過ぎれば期限切れ件数が変わり304にならない
+    due = (datetime.now(timezone.utc) + timedelta(seconds=1)).replace(tzinfo=None).isoformat()
+    client.post("/api/tasks", json={"title": "Soon", "due_date": due}, headers=auth_headers)
+
+    first = client.get("/api/tasks/stats", headers=auth_headers)
+    assert first.json()["overdue"] == 0
+    etag = first.headers["ETag"]
+    assert client.get("/api/tasks/stats", headers=dict(auth_headers, **{"If-None-Match": etag})).status_code == 304
+
+    time.sleep(2.5)
+    later = client.get("/api/tasks/stats", headers=dict(auth_headers, **{"If-None-Match": etag}))
+
+    assert later.status_code == 200
+    assert later.json()["overdue"] == 1
+
+def test_stats_counts_null_priority_as_medium(client, auth_headers):
+    client.post("/api/tasks", json={"title": "No priority", "priority": None}, headers=auth_headers)
+    client.post("/api/tasks", json={"title": "Medium", "priority": 2}, headers=auth_headers)
+    client.post("/api/tasks", json={"title": "High", "priority": 1}, headers=auth_headers)
+
+    response = client.get("/api/tasks/stats", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json()["by_priority"] == {"1": 1, "2": 2}
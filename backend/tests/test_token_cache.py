@@ -0,0 +1,66 @@
+import hashlib
+import time
+from datetime import timedelta
+import pytest
+from fastapi import HTTPException
+import auth
+from auth import create_access_token, token_cache, verify_token
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    """署名検証（_decode_token）の呼び出し回数"""
+    calls = []
+    decode = auth._decode_token
+
+    def counting_decode(token):
+        calls.append(token)
+        return decode(token)
+
+    monkeypatch.setattr(auth, "_decode_token", counting_decode)
+    return calls
+
+def test_verified_token_is_served_from_cache(decode_calls):
+    token = create_access_token({"user_id": 1})
+
+    first = verify_token(token)
+    second = verify_token(token)
+
+    assert first == second
+    assert len(decode_calls) == 1
+
+def test_expired_cache_entry_is_not_served(decode_calls):
+    token = create_access_token({"user_id": 1})
+    # 期限切れのペイロードがキャッシュに残っていても返さず、改めて検証する
+    token_cache.set(hashlib.sha256(token.encode()).digest(), {"user_id": 1, "exp": time.time() - 1})
+
+    payload = verify_token(token)
+
+    assert payload["exp"] > time.time()
+    assert len(decode_calls) == 1
+
+def test_expired_token_is_rejected_after_caching():
+    token = create_access_token({"user_id": 1}, expires_delta=timedelta(seconds=1))
+    verify_token(token)
+
+    time.sleep(2.1)
+
+    with pytest.raises(HTTPException) as error:
+        verify_token(token)
+    assert error.value.status_code == 401
+
+def test_tampered_token_is_not_cached(decode_calls):
+    token = create_access_token({"user_id": 1})
+    tampered = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+
+    for _ in range(2):
+        with pytest.raises(HTTPException):
+            verify_token(tampered)
+
+    assert len(decode_calls) == 2
+
+def test_profile_update_invalidates_cached_user(client, auth_headers):
+    assert client.get("/auth/me", headers=auth_headers).json()["full_name"] == "Alice"
+
+    client.put("/auth/me", json={"full_name": "Alice Updated"}, headers=auth_headers)
+
+    assert client.get("/auth/me", headers=auth_headers).json()["full_name"] == "Alice Updated"
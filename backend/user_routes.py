@@ -1,72 +1,87 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 import schemas
 import crud
+import passwords
+import etags
 from auth import create_user_token, get_current_user
 from database import get_db
+from last_login import last_login_recorder
 from config.settings import settings
+from security import api_rate_limit, auth_rate_limit
 
-router = APIRouter(tags=["authentication"])
+router = APIRouter(tags=["authentication"], dependencies=[Depends(api_rate_limit)])
 
-@router.post("/register", response_model=schemas.AuthResponse)
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    """新規ユーザー登録"""
+# 一意制約違反の項目ごとのエラーメッセージ
+DUPLICATE_FIELD_MESSAGES = {
+    "email": "Email already registered",
+    "username": "Username already taken",
+}
+
+def _duplicate_field_error(error: IntegrityError, default: str) -> HTTPException:
+    """IntegrityError を重複した項目に応じた400エラーに変換"""
+    field = crud.unique_violation_field(error)
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=DUPLICATE_FIELD_MESSAGES.get(field, default)
+    )
+
+def _login_profile(user) -> schemas.UserProfile:
+    """応答用プロフィール（非同期記録の場合は記録したログイン時刻を反映）"""
+    profile = schemas.UserProfile.model_validate(user)
+    if settings.last_login_async:
+        profile = profile.model_copy(update={"last_login": last_login_recorder.record(user.id)})
+    return profile
+
+# 登録・ログイン・パスワード変更は async エンドポイントとし、bcrypt の完了はイベントループ上で待つ
+# （ハッシュ処理の待ち時間にリクエスト用スレッドを占有しない）。DBアクセスはスレッドプールで実行する。
+@router.post("/register", response_model=schemas.AuthResponse, dependencies=[Depends(auth_rate_limit)])
+async def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
+    """新規ユーザー登録（重複は事前SELECTではなく一意制約で検出）"""
     
-    # 既存ユーザーの確認（メールアドレス）
-    existing_user = crud.get_user_by_email(db, email=user.email)
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+    hashed_password = await passwords.hash_password_async(user.password)
+    try:
+        # ユーザー作成（最終ログイン時刻も同じINSERTで設定）
+        db_user = await run_in_threadpool(
+            crud.create_user, db, user,
+            record_login=not settings.last_login_async, hashed_password=hashed_password
         )
+    except IntegrityError as e:
+        await run_in_threadpool(db.rollback)
+        raise _duplicate_field_error(e, "User registration failed due to database constraint")
     
-    # 既存ユーザーの確認（ユーザー名）
-    existing_user = crud.get_user_by_username(db, username=user.username)
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already taken"
-        )
+    # JWTトークン作成
+    access_token = create_user_token(user_id=db_user.id)
     
-    try:
-        # ユーザー作成
-        db_user = crud.create_user(db=db, user=user)
-        
-        # JWTトークン作成
-        access_token = create_user_token(user_id=db_user.id)
-        
-        # 最終ログイン時刻を更新
-        crud.update_user_last_login(db, db_user.id)
-        
-        return schemas.AuthResponse(
-            message="User registered successfully",
-            user=schemas.UserProfile.model_validate(db_user),
-            access_token=access_token,
-            token_type="bearer",
-            expires_in=settings.access_token_expire_hours * 3600
-        )
-        
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="User registration failed due to database constraint"
-        )
+    return schemas.AuthResponse(
+        message="User registered successfully",
+        user=_login_profile(db_user),
+        access_token=access_token,
+        token_type="bearer",
+        expires_in=settings.access_token_expire_hours * 3600
+    )
 
-@router.post("/login", response_model=schemas.AuthResponse)
-def login_user(user_login: schemas.UserLogin, db: Session = Depends(get_db)):
-    """ユーザーログイン"""
+@router.post("/login", response_model=schemas.AuthResponse, dependencies=[Depends(auth_rate_limit)])
+async def login_user(user_login: schemas.UserLogin, db: Session = Depends(get_db)):
+    """ユーザーログイン（最終ログイン時刻は UPDATE ... RETURNING の1文で記録）"""
     
     # ユーザー認証
-    user = crud.authenticate_user(db, email=user_login.email, password=user_login.password)
-    if not user:
+    user = await run_in_threadpool(crud.get_user_by_email, db, user_login.email)
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await passwords.verify_and_update_async(user_login.password, user.hashed_password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    user = await run_in_threadpool(
+        crud.complete_login, db, user, new_hash=new_hash, record_login=not settings.last_login_async
+    )
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -77,50 +92,37 @@ def login_user(user_login: schemas.UserLogin, db: Session = Depends(get_db)):
     # JWTトークン作成
     access_token = create_user_token(user_id=user.id)
     
-    # 最終ログイン時刻を更新
-    crud.update_user_last_login(db, user.id)
-    
     return schemas.AuthResponse(
         message="Login successful",
-        user=schemas.UserProfile.model_validate(user),
+        user=_login_profile(user),
         access_token=access_token,
         token_type="bearer",
         expires_in=settings.access_token_expire_hours * 3600
     )
 
 @router.get("/me", response_model=schemas.UserProfile)
-def get_current_user_profile(current_user: schemas.User = Depends(get_current_user)):
-    """現在のユーザープロフィールを取得"""
-    return schemas.UserProfile.model_validate(current_user)
+def get_current_user_profile(request: Request, current_user: schemas.User = Depends(get_current_user)):
+    """現在のユーザープロフィールを取得（本文のハッシュをETagとして条件付きGETに対応）"""
+    profile = schemas.UserProfile.model_validate(current_user)
+    return etags.json_response_with_etag(request, profile.model_dump_json().encode())
 
 @router.put("/me", response_model=schemas.UserProfile)
-def update_current_user_profile(
+async def update_current_user_profile(
     user_update: schemas.UserUpdate,
     current_user: schemas.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """現在のユーザープロフィールを更新"""
+    """現在のユーザープロフィールを更新（メールアドレス・ユーザー名の重複は一意制約で検出）"""
     
-    # メールアドレスが変更される場合、重複チェック
-    if user_update.email and user_update.email != current_user.email:
-        existing_user = crud.get_user_by_email(db, email=user_update.email)
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
-            )
-    
-    # ユーザー名が変更される場合、重複チェック
-    if user_update.username and user_update.username != current_user.username:
-        existing_user = crud.get_user_by_username(db, username=user_update.username)
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already taken"
-            )
+    hashed_password = None
+    if user_update.password:
+        hashed_password = await passwords.hash_password_async(user_update.password)
     
     try:
-        updated_user = crud.update_user(db, user_id=current_user.id, user_update=user_update)
+        updated_user = await run_in_threadpool(
+            crud.update_user, db, user_id=current_user.id, user_update=user_update,
+            hashed_password=hashed_password
+        )
         if not updated_user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -129,12 +131,9 @@ def update_current_user_profile(
         
         return schemas.UserProfile.model_validate(updated_user)
         
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Update failed due to database constraint"
-        )
+    except IntegrityError as e:
+        await run_in_threadpool(db.rollback)
+        raise _duplicate_field_error(e, "Update failed due to database constraint")
 
 @router.post("/verify-token", response_model=schemas.UserProfile)
 def verify_user_token(current_user: schemas.User = Depends(get_current_user)):